@@ -0,0 +1,91 @@
+"""
+Publish-to-broadcast latency of the broadcaster in "poll" and "event" mode.
+
+A thread publishes BSE books through OFSScraper.publish_bse at random
+intervals, the way a scraper thread would, and in-process fake clients
+receive the frames. No network or browser is involved.
+
+    python -m benchmarks.broadcast_latency --updates 100 --clients 50
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import logging
+
+# benchmark books are not recorded
+os.environ["OFS_STORE_DIR"] = ""
+os.environ["OFS_LATEST_DIR"] = ""
+import server
+from fanout import ClientConnection
+
+
+class FakeClient:
+    def __init__(self):
+        self.frames = 0
+
+    async def send_bytes(self, frame):
+        self.frames += 1
+
+    async def send_text(self, frame):
+        self.frames += 1
+
+    async def close(self, code=1000):
+        pass
+
+
+def publish_books(issue, updates, interval):
+    for i in range(updates):
+        book = {685.0 + level * 0.05: random.randint(1, 10_000) for level in range(200)}
+        server.scraper.publish_bse(issue, book, None)
+        time.sleep(random.uniform(0, 2 * interval))
+
+
+async def run(mode, updates, interval, n_clients):
+    issue_id = server.DEFAULT_ISSUE_ID
+    issue = server.scraper.issues[issue_id]
+
+    server.update_signal.bind(asyncio.get_running_loop())
+    server.broadcast_latency.update(count=0, total=0.0, max=0.0)
+
+    fakes = [FakeClient() for _ in range(n_clients)]
+    conns = [ClientConnection(f, issue_id, server.snapshot_source(issue_id)) for f in fakes]
+    for c in conns:
+        server.subscribe(c)
+    writers = [asyncio.create_task(c.run()) for c in conns]
+
+    task = asyncio.create_task(server.broadcaster(mode))
+    try:
+        await asyncio.to_thread(publish_books, issue, updates, interval)
+        await asyncio.sleep(0.6)
+    finally:
+        for t in [task, *writers]:
+            t.cancel()
+        await asyncio.gather(task, *writers, return_exceptions=True)
+        for c in conns:
+            server.unsubscribe(c)
+
+    stats = server.broadcast_latency
+    return stats["count"], stats["total"] / max(stats["count"], 1), stats["max"], fakes[0].frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.05, help="mean seconds between publishes")
+    parser.add_argument("--clients", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    for mode in ("poll", "event"):
+        count, avg, worst, frames = asyncio.run(run(mode, args.updates, args.interval, args.clients))
+        print(
+            f"{mode:<6} broadcasts={count:<5} frames/client={frames:<5} "
+            f"avg={avg * 1000:8.2f}ms max={worst * 1000:8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares BSE page fetch latency against a local server that serves bse.html:
+
+  requests   a fresh requests.get per cycle, as scrape_bse used to do
+  pooled     BSEClient with keep-alive, changed page every cycle
+  cond       BSEClient with keep-alive, unchanged page (304 path)
+
+    python -m benchmarks.bse_fetch --iterations 200
+"""
+import time
+import asyncio
+import argparse
+import statistics
+import requests
+from bse_client import BSEClient, BSE_BID_DETAILS_PATH
+from benchmarks.stub_server import serve_in_background
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    print(
+        f"{name:<10} mean={statistics.mean(samples) * 1000:7.2f}ms "
+        f"p50={samples[len(samples) // 2] * 1000:7.2f}ms "
+        f"p99={samples[int(len(samples) * 0.99) - 1] * 1000:7.2f}ms"
+    )
+
+
+def bench_requests(base_url, iterations):
+    url = f"{base_url}{BSE_BID_DETAILS_PATH}?flag=R&Scripcode=500188"
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30).text
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def bench_client(base_url, iterations, conditional):
+    client = BSEClient(base_url=base_url)
+    samples = []
+    try:
+        await client.fetch("500188")
+        for _ in range(iterations):
+            if not conditional:
+                client.validators.clear()
+            t0 = time.perf_counter()
+            await client.fetch("500188")
+            samples.append(time.perf_counter() - t0)
+    finally:
+        await client.aclose()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--bse-html", default="bse.html")
+    args = parser.parse_args()
+
+    server, base_url = serve_in_background(bse_html=args.bse_html)
+    try:
+        report("requests", bench_requests(base_url, args.iterations))
+        report("pooled", asyncio.run(bench_client(base_url, args.iterations, conditional=False)))
+        report("cond", asyncio.run(bench_client(base_url, args.iterations, conditional=True)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Parses per second for each available BSE table parser backend, run against
+the checked-in bse.html fixture. Every backend is checked against the bs4
+result before it is timed.
+
+    python -m benchmarks.bse_parse --seconds 2
+"""
+import time
+import argparse
+from bse_parsers import BACKENDS, parse_bse_book
+
+
+def parses_per_second(html, backend, seconds):
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        parse_bse_book(html, backend)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", default="bse.html")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        html = f.read()
+
+    expected = parse_bse_book(html, "bs4")
+    baseline = None
+
+    for backend in BACKENDS:
+        if parse_bse_book(html, backend) != expected:
+            raise SystemExit(f"{backend} disagrees with bs4 on {args.fixture}")
+
+        rate = parses_per_second(html, backend, args.seconds)
+        baseline = baseline or rate
+        print(f"{backend:<11} {rate:10.1f} parses/s  x{rate / baseline:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
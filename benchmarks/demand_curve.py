@@ -0,0 +1,92 @@
+"""
+Merged demand curve: server.merge_price_qty + cumulative_high_to_low
+(dicts and a per-level row list) against the vectorized curve.py path,
+plus OrderBook against VectorBook on a stream of venue updates.
+
+The equivalence of these paths is tested in tests/test_curve.py.
+
+    python -m benchmarks.demand_curve --levels 20000 --rounds 20
+"""
+import os
+import time
+import random
+import argparse
+from orderbook import OrderBook
+from curve import VectorBook, merge_price_qty, cumulative_high_to_low
+
+# benchmark books are not recorded
+os.environ["OFS_STORE_DIR"] = ""
+os.environ["OFS_LATEST_DIR"] = ""
+import server
+
+FLOOR_PRICE = 685.0
+
+
+def synthetic_book(levels, overlap=0.5):
+    """levels price points, about `overlap` of them shared with the other
+    venue's grid."""
+    step = 0.05
+    offset = 0 if random.random() < overlap else step / 2
+    return {
+        round(FLOOR_PRICE + i * step + offset, 3): random.randint(0, 50_000)
+        for i in range(levels)
+    }
+
+
+def mutate(book, fraction):
+    book = dict(book)
+    for price in random.sample(list(book), max(1, int(len(book) * fraction))):
+        book[price] = random.randint(0, 50_000)
+    return book
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, default=20_000, help="price levels per venue")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    nse = synthetic_book(args.levels)
+    bse = synthetic_book(args.levels)
+    total = sum(nse.values()) + sum(bse.values())
+    issue_size = total // 3
+
+    def dict_path():
+        merged = server.merge_price_qty(nse, bse, FLOOR_PRICE, 1_000)
+        server.cumulative_high_to_low(merged, issue_size)
+
+    def numpy_path():
+        prices, qty = merge_price_qty(nse, bse, FLOOR_PRICE, 1_000)
+        cumulative_high_to_low(prices, qty, issue_size)
+
+    dict_time = timed(dict_path, args.rounds)
+    numpy_time = timed(numpy_path, args.rounds)
+    print(f"full rebuild   dict={dict_time * 1000:8.2f}ms numpy={numpy_time * 1000:8.2f}ms "
+          f"speedup={dict_time / numpy_time:5.1f}x")
+
+    # a tick: one venue changes 5% of its levels, then cutoff and metrics
+    # are read, as broadcast_issue does
+    stream = [("nse" if i % 2 else "bse", mutate(nse if i % 2 else bse, 0.05)) for i in range(args.rounds)]
+    for name, backend in (("orderbook", OrderBook), ("numpy", VectorBook)):
+        book = backend(issue_size)
+        book.update_venue("nse", nse)
+        book.update_venue("bse", bse)
+        start = time.perf_counter()
+        for venue, levels in stream:
+            book.update_venue(venue, levels)
+            book.drain_changes()
+            book.cutoff_price()
+            book.total_demand()
+        per_tick = (time.perf_counter() - start) / len(stream)
+        print(f"tick {name:<10} {per_tick * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
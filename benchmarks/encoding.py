@@ -0,0 +1,87 @@
+"""
+Frame size and encode/decode time of each WebSocket encoding (json,
+packed and, if installed, msgpack) for snapshots and deltas of large
+books. Every encoding is decoded and checked against the JSON message
+before timing.
+
+    python -m benchmarks.encoding --levels 1000,10000,50000
+"""
+import time
+import random
+import argparse
+from orderbook import OrderBook
+from curve import VectorBook
+from protocol import BookStream, ENCODINGS, decode
+
+FLOOR_PRICE = 685.0
+
+
+def build_book(backend, levels, seed=3):
+    rng = random.Random(seed)
+    book = backend(4_757_707)
+    nse = {round(FLOOR_PRICE + i * 0.05, 2): rng.randint(1, 50_000) for i in range(levels)}
+    book.update_venue("nse", nse)
+    book.update_venue("bse", {round(FLOOR_PRICE + i * 0.05, 2): rng.randint(1, 50_000) for i in range(0, levels, 2)})
+    return book, nse, rng
+
+
+def best_of(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", default="1000,10000,50000")
+    parser.add_argument("--changes", type=int, default=50, help="levels changed per delta")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--backend", choices=("orderbook", "numpy"), default="orderbook")
+    args = parser.parse_args()
+
+    backend = VectorBook if args.backend == "numpy" else OrderBook
+    meta = {"cutoff_price": 690.5, "total_demand": 123456789, "subscription_pct": 101.5, "nse_last_updated_ts": time.time()}
+
+    for levels in map(int, args.levels.split(",")):
+        book, nse, rng = build_book(backend, levels)
+        stream = BookStream("BENCH")
+        stream.publish(book, meta)
+
+        nse = dict(nse)
+        for price in rng.sample(list(nse), args.changes):
+            nse[price] += 1
+        book.update_venue("nse", nse)
+        stream.advance(book, meta)
+
+        print(f"levels={levels}")
+        expected = {
+            "snapshot": decode(stream.snapshot_frame(book, "json")),
+            "delta": decode(stream.delta_frame("json")),
+        }
+        for encoding in ENCODINGS:
+            for kind in ("snapshot", "delta"):
+                def encode_frame():
+                    # drop the cache so every round encodes
+                    stream.snapshots.pop(encoding, None)
+                    stream.deltas.pop(encoding, None)
+                    if kind == "snapshot":
+                        return stream.snapshot_frame(book, encoding)
+                    return stream.delta_frame(encoding)
+
+                frame = encode_frame()
+                if decode(frame, encoding) != expected[kind]:
+                    raise SystemExit(f"{encoding} {kind} does not decode to the JSON message")
+
+                encode_s = best_of(encode_frame, args.rounds)
+                decode_s = best_of(lambda: decode(frame, encoding), args.rounds)
+                print(
+                    f"  {encoding:<8} {kind:<8} {len(frame):>10,} B  "
+                    f"encode={encode_s * 1000:8.2f}ms  decode={decode_s * 1000:8.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
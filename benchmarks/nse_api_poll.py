@@ -0,0 +1,124 @@
+"""
+Runs the NSE API poller (OFSScraper.poll_nse_endpoints over NSEApiClient)
+against the local stub server and checks what it publishes:
+
+  - the stub rejects requests without the session cookie, so the first
+    fetch exercises the session-expired path; the first rediscover()
+    fails, the second hands out the cookie
+  - the payload is then parsed and published once, and repeated polls of
+    the same body only refresh the timestamp
+
+    python -m benchmarks.nse_api_poll --cycles 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from issues import DEFAULT_ISSUES
+from nse_api import NSEApiClient
+from nsebse import OFSScraper
+from scheduler import PollScheduler
+from benchmarks.stub_server import serve_in_background
+
+SESSION_COOKIE = "nsit"
+
+PAYLOAD = {
+    "data": [
+        {
+            "companyName": "Hindustan Zinc Limited",
+            "bids": [
+                {"price": "Cut-off", "totalQty": "1,200"},
+                {"price": "685.00", "totalQty": "25,000"},
+                {"price": "690.50", "totalQty": "7,500"},
+            ],
+        }
+    ]
+}
+EXPECTED_BOOK = {685.0: 25_000, 690.5: 7_500}
+
+
+def fast_scheduler():
+    scheduler = PollScheduler(
+        base_interval=0.02,
+        min_interval=0.02,
+        max_interval=0.02,
+        closed_interval=0.02,
+        backoff_base=0.02,
+        backoff_max=0.05,
+    )
+    scheduler.add_host("nse", rate=1000, burst=1000)
+    return scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cycles", type=int, default=20, help="successful polls to run")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as nse_dir:
+        with open(os.path.join(nse_dir, "payload.json"), "w", encoding="utf-8") as f:
+            json.dump(PAYLOAD, f)
+
+        server, base_url = serve_in_background(nse_dir=nse_dir, require_cookie=SESSION_COOKIE, bse_html=None)
+        scraper = OFSScraper(issues=DEFAULT_ISSUES)
+        scraper.scheduler = fast_scheduler()
+
+        grouped = scraper.issues_by_category()
+        endpoints = {category: f"{base_url}/api/loadOfs{category.title()}" for category in grouped}
+        rediscovered = []
+
+        def rediscover():
+            rediscovered.append(time.time())
+            if len(rediscovered) == 1:
+                raise TimeoutError("page reload timed out")
+            return dict(endpoints), {}, [{"name": SESSION_COOKIE, "value": "stub"}]
+
+        client = NSEApiClient()
+        poller = threading.Thread(
+            target=scraper.poll_nse_endpoints,
+            args=(client, grouped, dict(endpoints), {}, rediscover),
+            name="NSE-api",
+            daemon=True,
+        )
+        start = time.perf_counter()
+        poller.start()
+        try:
+            stats = scraper.cycle_stats["nse"]
+            deadline = time.time() + args.timeout
+            while stats["processed"] + stats["skipped"] < args.cycles and poller.is_alive():
+                if time.time() > deadline:
+                    sys.exit("timed out waiting for the poller")
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+        finally:
+            scraper.nseRunning = False
+            poller.join(timeout=5)
+            client.close()
+            server.shutdown()
+
+    snapshot = scraper.books["HINDZINC"].nse
+    failures = []
+    if not poller.is_alive() and stats["processed"] + stats["skipped"] < args.cycles:
+        failures.append("poller thread exited early")
+    if len(rediscovered) < 2:
+        failures.append(f"expected a failed and a successful rediscover, got {len(rediscovered)} calls")
+    if snapshot.book != EXPECTED_BOOK or snapshot.cutoff_qty != 1_200:
+        failures.append(f"published {snapshot.book} cutoff={snapshot.cutoff_qty}")
+    if stats["processed"] != 1 or snapshot.version != 1:
+        failures.append(f"unchanged payload was re-published: {stats} version={snapshot.version}")
+
+    print(
+        f"cycles={stats['processed'] + stats['skipped']} processed={stats['processed']} "
+        f"skipped={stats['skipped']} rediscovers={len(rediscovered)} time={elapsed:.2f}s"
+    )
+    if failures:
+        sys.exit("\n".join(failures))
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+End-to-end throughput of merge, cumulative and fan-out, driven by
+ReplayScraper at full speed.
+
+A synthetic session (a random walk over both venues' books) is recorded
+into a temporary BookStore, then replayed book by book: each publish is
+followed by a broadcast_issue and the in-process fake clients' sends, so
+books/s covers merge, encode and fan-out of every book. Pass --source to replay a real store or
+directory of scraper outputs instead.
+
+    python -m benchmarks.replay_throughput --books 2000 --levels 500 --clients 100
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from store import BookStore
+from issues import DEFAULT_ISSUES
+
+
+def record_session(root, books, levels):
+    issue = DEFAULT_ISSUES[0]
+    store = BookStore(root, fsync="never", batch_size=256)
+    prices = [issue.floor_price + i * 0.05 for i in range(levels)]
+    current = {"nse": {}, "bse": {}}
+    ts = time.time()
+
+    for i in range(books):
+        venue = "nse" if i % 2 else "bse"
+        book = current[venue]
+        for price in random.sample(prices, max(1, levels // 20)):
+            book[round(price, 2)] = random.randint(1, 50_000)
+        ts += 0.5
+        store.append(issue.issue_id, venue, ts, dict(book))
+
+    store.close()
+
+
+async def run(source, n_clients, speed):
+    os.environ["OFS_SOURCE"] = "replay"
+    os.environ["OFS_REPLAY_PATH"] = source
+    os.environ["OFS_REPLAY_SPEED"] = str(speed)
+    os.environ["OFS_STORE_DIR"] = ""
+    os.environ["OFS_LATEST_DIR"] = ""
+    import server
+    from fanout import ClientConnection
+    from benchmarks.broadcast_latency import FakeClient
+
+    issue_id = server.DEFAULT_ISSUE_ID
+    scraper = server.scraper
+
+    fakes = [FakeClient() for _ in range(n_clients)]
+    conns = [ClientConnection(f, issue_id, server.snapshot_source(issue_id)) for f in fakes]
+    for c in conns:
+        server.subscribe(c)
+    writers = [asyncio.create_task(c.run()) for c in conns]
+
+    # the event broadcaster would coalesce a full-speed replay into a
+    # handful of broadcasts, so every book is broadcast here as it is
+    # published and the writers get to send it before the next one
+    broadcasts = 0
+    start = time.time()
+    first_ts = None
+    try:
+        for ts, event_issue, venue, book, cutoff_qty in scraper.events():
+            if speed:
+                if first_ts is None:
+                    first_ts = ts
+                delay = (ts - first_ts) / speed - (time.time() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            scraper.publish(event_issue, venue, book, cutoff_qty)
+            seq = server.streams[event_issue].seq
+            server.broadcast_issue(event_issue, scraper.issues[event_issue], time.time())
+            broadcasts += server.streams[event_issue].seq != seq
+            while any(c.queue or c.needs_snapshot for c in conns if not c.closed):
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.2)
+    finally:
+        elapsed = time.time() - start
+        for t in writers:
+            t.cancel()
+        await asyncio.gather(*writers, return_exceptions=True)
+
+    return scraper.replayed, broadcasts, fakes[0].frames, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", help="store or output directory; synthetic session if omitted")
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--levels", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--speed", type=float, default=0, help="0 replays as fast as possible")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if source is None:
+            source = tmp
+            record_session(source, args.books, args.levels)
+
+        replayed, broadcasts, frames, elapsed = asyncio.run(run(source, args.clients, args.speed))
+
+    print(
+        f"books={replayed} broadcasts={broadcasts} frames/client={frames} "
+        f"time={elapsed:.2f}s books/s={replayed / elapsed:,.0f} "
+        f"broadcasts/s={broadcasts / elapsed:,.0f} frames/s={frames * args.clients / elapsed:,.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
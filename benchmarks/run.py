@@ -0,0 +1,423 @@
+"""
+Offline benchmark suite with machine-readable results and regression
+thresholds, for comparing changes to nsebse.py and server.py run to run.
+
+Cases:
+    bse_parse[<backend>]   parse_bse_book on the bse.html fixture, per backend
+    nse_extract[bulk|dom]  OFSScraper NSE extraction on nse.html, opened in
+                           headless Chromium through a file:// URL
+    book_build[<backend>,<levels>]
+                           a fresh OrderBook / VectorBook from synthetic NSE
+                           and BSE books and a floor level, then
+                           cutoff_price() and levels()
+    book_update[<backend>,<levels>]
+                           the broadcaster's per-publish work: one venue
+                           update changing 5% of its levels, then
+                           cutoff_price() and levels()
+    fanout[<clients>]      one delta frame through ClientConnection to N
+                           in-process clients, until all have sent it
+
+Each case is timed `--repeat` times, every sample looping enough calls to
+last at least `--min-time`; results are seconds per call. With
+`--baseline` a case whose median is more than its threshold slower than
+the baseline's fails the run (exit status 1).
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --only book_build,book_update
+    python -m benchmarks.run --baseline bench.json --threshold fanout=0.5
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FLOOR_PRICE = 685.0
+ISSUE_SIZE = 4_757_707
+
+# allowed slowdown of the median against the baseline, per case family
+DEFAULT_THRESHOLDS = {
+    "bse_parse": 0.15,
+    "nse_extract": 0.30,
+    "book_build": 0.15,
+    "book_update": 0.15,
+    "fanout": 0.30,
+}
+
+
+class Skip(Exception):
+    pass
+
+
+class Samples:
+    """A case that times itself: collect() returns seconds per call,
+    one value per sample."""
+
+    def __init__(self, collect):
+        self.collect = collect
+
+
+def synthetic_books(levels, seed=7):
+    """An NSE and a BSE book of `levels` prices each, about half of them
+    on a shared 0.05 grid."""
+    rng = random.Random(seed)
+    nse = {round(FLOOR_PRICE + i * 0.05, 2): rng.randint(1, 50_000) for i in range(levels)}
+    bse = {
+        round(FLOOR_PRICE + i * 0.05 + (0 if rng.random() < 0.5 else 0.025), 3): rng.randint(1, 50_000)
+        for i in range(levels)
+    }
+    return nse, bse
+
+
+def measure(fn, repeat, min_time):
+    """Seconds per call of fn(), one value per sample."""
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return samples, number
+
+
+def bse_parse_cases(args):
+    from bse_parsers import BACKENDS, parse_bse_book
+
+    html = (ROOT / "bse.html").read_text(encoding="utf-8")
+    expected = parse_bse_book(html, "bs4")
+    for backend in BACKENDS:
+        if parse_bse_book(html, backend) != expected:
+            raise SystemExit(f"bse_parse: {backend} disagrees with bs4 on bse.html")
+        yield f"bse_parse[{backend}]", {"levels": len(expected[0])}, lambda b=backend: parse_bse_book(html, b)
+
+
+def book_backends():
+    from orderbook import OrderBook
+
+    backends = {"orderbook": OrderBook}
+    try:
+        from curve import VectorBook
+    except ImportError:
+        pass
+    else:
+        backends["numpy"] = VectorBook
+    return backends
+
+
+def new_book(backend, nse, bse):
+    book = backend(ISSUE_SIZE)
+    book.update_venue("nse", nse)
+    book.update_venue("bse", bse)
+    book.update_venue("floor", {FLOOR_PRICE: 1000})
+    return book
+
+
+def read_book(book):
+    return book.cutoff_price(), book.levels()
+
+
+def changed_book(book, seed=13):
+    """A copy of `book` with 5% of its quantities changed."""
+    rng = random.Random(seed)
+    changed = dict(book)
+    for price in rng.sample(list(book), max(1, len(book) // 20)):
+        changed[price] = rng.randint(1, 50_000)
+    return changed
+
+
+def book_build_cases(args):
+    backends = book_backends()
+    for levels in args.levels:
+        nse, bse = synthetic_books(levels)
+        expected = read_book(new_book(backends["orderbook"], nse, bse))
+        for name, backend in backends.items():
+            if read_book(new_book(backend, nse, bse)) != expected:
+                raise SystemExit(f"book_build: {name} disagrees with orderbook at {levels} levels")
+            yield f"book_build[{name},{levels}]", {"levels": levels}, (
+                lambda b=backend, n=nse, s=bse: read_book(new_book(b, n, s))
+            )
+
+
+def book_update_cases(args):
+    backends = book_backends()
+    for levels in args.levels:
+        nse, bse = synthetic_books(levels)
+        variants = (nse, changed_book(nse))
+        expected = read_book(new_book(backends["orderbook"], variants[1], bse))
+
+        for name, backend in backends.items():
+            book = new_book(backend, nse, bse)
+            book.update_venue("nse", variants[1])
+            if read_book(book) != expected:
+                raise SystemExit(f"book_update: {name} disagrees with orderbook at {levels} levels")
+
+            # alternate between the two NSE books so every call changes levels
+            turn = [0]
+
+            def update(book=book):
+                turn[0] ^= 1
+                book.update_venue("nse", variants[turn[0]])
+                return read_book(book)
+
+            yield f"book_update[{name},{levels}]", {"levels": levels, "changed": levels // 20}, update
+
+
+class FakeClient:
+    def __init__(self, done):
+        self.done = done
+
+    async def send_bytes(self, frame):
+        self.done()
+
+    async def send_text(self, frame):
+        self.done()
+
+    async def close(self, code=1000):
+        pass
+
+
+async def fanout_round_times(n_clients, rounds, levels):
+    from orderbook import OrderBook
+    from protocol import BookStream
+    from fanout import ClientConnection
+
+    book = OrderBook(ISSUE_SIZE)
+    stream = BookStream("BENCH")
+    nse, bse = synthetic_books(levels)
+    book.update_venue("nse", nse)
+    book.update_venue("bse", bse)
+    stream.publish(book, {})
+
+    sent = [0]
+    all_sent = asyncio.Event()
+
+    def done():
+        sent[0] += 1
+        if sent[0] == n_clients:
+            all_sent.set()
+
+    conns = [
+        ClientConnection(FakeClient(done), "BENCH", lambda: stream.snapshot_frame(book), max_queue=rounds + 1)
+        for _ in range(n_clients)
+    ]
+    writers = [asyncio.create_task(c.run()) for c in conns]
+
+    rng = random.Random(11)
+    times = []
+    try:
+        # the first frame each client sends is its snapshot
+        await all_sent.wait()
+
+        for _ in range(rounds):
+            changes = dict(nse)
+            for price in rng.sample(list(nse), 20):
+                changes[price] = rng.randint(1, 50_000)
+            book.update_venue("nse", changes)
+            delta = stream.publish(book, {})
+
+            sent[0] = 0
+            all_sent.clear()
+            start = time.perf_counter()
+            for c in conns:
+                c.offer(delta)
+            await all_sent.wait()
+            times.append(time.perf_counter() - start)
+    finally:
+        # close rather than cancel: wait_for() on a send that has already
+        # completed can swallow the cancellation
+        for c in conns:
+            await c.close()
+        await asyncio.gather(*writers, return_exceptions=True)
+    return times
+
+
+def fanout_cases(args):
+    for n_clients in args.clients:
+        rounds = max(args.repeat, 20)
+        yield f"fanout[{n_clients}]", {"clients": n_clients, "rounds": rounds}, Samples(
+            lambda n=n_clients: asyncio.run(fanout_round_times(n, rounds, 500))
+        )
+
+
+def nse_extract_cases(args):
+    try:
+        from playwright.sync_api import sync_playwright
+        from nsebse import OFSScraper, NSE_CATEGORIES
+    except ImportError as e:
+        raise Skip(f"playwright not installed ({e})")
+
+    table = NSE_CATEGORIES["general"][2]
+    scraper = OFSScraper()
+    url = (ROOT / "nse.html").as_uri()
+
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.launch(headless=True)
+        except Exception as e:
+            raise Skip(f"chromium unavailable ({str(e).splitlines()[0]})")
+        try:
+            page = browser.new_page()
+            # keep the fixture offline: drop the scripts and assets it references
+            page.route("**/*", lambda route: route.continue_() if route.request.url.startswith("file:") else route.abort())
+            page.goto(url, wait_until="domcontentloaded")
+            page.wait_for_selector(f"{table} tbody tr", state="attached")
+
+            expected = scraper.extract_nse_bulk(page, table)
+            if scraper.extract_nse_dom(page, table) != expected:
+                raise SystemExit("nse_extract: bulk and dom extraction disagree on nse.html")
+            rows = sum(len(book) for book, _ in expected.values())
+
+            yield "nse_extract[bulk]", {"rows": rows}, lambda: scraper.extract_nse_bulk(page, table)
+            yield "nse_extract[dom]", {"rows": rows}, lambda: scraper.extract_nse_dom(page, table)
+        finally:
+            browser.close()
+
+
+SUITES = {
+    "bse_parse": bse_parse_cases,
+    "nse_extract": nse_extract_cases,
+    "book_build": book_build_cases,
+    "book_update": book_update_cases,
+    "fanout": fanout_cases,
+}
+
+
+def summarize(samples, number):
+    ordered = sorted(samples)
+    return {
+        "unit": "s",
+        "median": statistics.median(ordered),
+        "min": ordered[0],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "samples": len(ordered),
+        "loops": number,
+    }
+
+
+def compare(results, baseline, thresholds):
+    regressions = []
+    for name, result in results.items():
+        if result["status"] != "ok":
+            continue
+        family = name.split("[", 1)[0]
+        threshold = thresholds.get(name, thresholds.get(family, 0.2))
+        result["threshold"] = threshold
+
+        before = baseline.get(name)
+        if before is None or before.get("status") != "ok":
+            result["status"] = "new"
+            continue
+
+        change = result["median"] / before["median"] - 1
+        result["baseline_median"] = before["median"]
+        result["change"] = round(change, 4)
+        if change > threshold:
+            result["status"] = "regressed"
+            regressions.append(name)
+        elif change < -threshold:
+            result["status"] = "improved"
+    return regressions
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def parse_list(value, cast=str):
+    return [cast(v) for v in value.split(",") if v]
+
+
+def parse_thresholds(values):
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for value in values:
+        name, _, limit = value.partition("=")
+        thresholds[name] = float(limit)
+    return thresholds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", type=parse_list, default=list(SUITES), help="comma-separated suites")
+    parser.add_argument("--levels", type=lambda v: parse_list(v, int), default=[1000, 10000])
+    parser.add_argument("--clients", type=lambda v: parse_list(v, int), default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per sample")
+    parser.add_argument("--output", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", action="append", default=[], help="NAME=FRACTION, NAME a suite or a case")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    thresholds = parse_thresholds(args.threshold)
+
+    results = {}
+    for suite in args.only:
+        if suite not in SUITES:
+            raise SystemExit(f"unknown suite {suite!r}, expected one of {', '.join(SUITES)}")
+        try:
+            for name, params, fn in SUITES[suite](args):
+                if isinstance(fn, Samples):
+                    samples, number = fn.collect(), 1
+                else:
+                    samples, number = measure(fn, args.repeat, args.min_time)
+                results[name] = {"status": "ok", "params": params, **summarize(samples, number)}
+                print(f"{name:<24} median={results[name]['median'] * 1000:10.3f}ms", file=sys.stderr)
+        except Skip as e:
+            results[suite] = {"status": "skipped", "reason": str(e)}
+            print(f"{suite:<24} skipped: {e}", file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], thresholds)
+        for name, result in results.items():
+            if "change" in result:
+                print(f"{name:<24} {result['change']:+8.1%} vs baseline  {result['status']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "min_time": args.min_time,
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
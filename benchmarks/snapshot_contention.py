@@ -0,0 +1,122 @@
+"""
+Reader/writer contention on scraper state: the old lock + deepcopy
+handoff against immutable VenueSnapshot swaps.
+
+Two writer threads publish NSE and BSE books the way the scrapers do,
+while many reader threads consume both venues the way the broadcaster
+does, each pausing `--read-interval` between reads. Reports reads/s,
+writes/s and the time a writer spends per publish.
+
+    python -m benchmarks.snapshot_contention --readers 32 --levels 500 --seconds 3
+"""
+import copy
+import time
+import random
+import argparse
+import threading
+from nsebse import IssueBook
+from issues import DEFAULT_ISSUES
+
+
+class LockedBook:
+    """The previous IssueBook handoff: mutable fields under one lock,
+    readers deep-copy the books."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nse_data = {}
+        self.bse_data = {}
+        self.nse_cutoff_qty = None
+        self.bse_cutoff_qty = None
+        self.nse_last_updated_ts = None
+        self.bse_last_updated_ts = None
+
+    def publish(self, venue, book, cutoff_qty):
+        with self.lock:
+            setattr(self, f"{venue}_last_updated_ts", time.time())
+            if getattr(self, f"{venue}_cutoff_qty") is None:
+                setattr(self, f"{venue}_cutoff_qty", cutoff_qty)
+            setattr(self, f"{venue}_data", book)
+
+    def read(self):
+        with self.lock:
+            nse = copy.deepcopy(self.nse_data)
+            bse = copy.deepcopy(self.bse_data)
+            floor_qty = (self.nse_cutoff_qty or 0) + (self.bse_cutoff_qty or 0)
+        return len(nse) + len(bse) + floor_qty
+
+
+class SnapshotBook:
+    def __init__(self):
+        self.state = IssueBook(DEFAULT_ISSUES[0])
+
+    def publish(self, venue, book, cutoff_qty):
+        setattr(self.state, venue, getattr(self.state, venue).updated(book, cutoff_qty, time.time()))
+
+    def read(self):
+        nse = self.state.nse
+        bse = self.state.bse
+        floor_qty = (nse.cutoff_qty or 0) + (bse.cutoff_qty or 0)
+        return len(nse.book) + len(bse.book) + floor_qty
+
+
+def run(target, n_readers, levels, seconds, read_interval):
+    books = [
+        {685.0 + i * 0.05: random.randint(1, 50_000) for i in range(levels)}
+        for _ in range(16)
+    ]
+    stop = threading.Event()
+    reads = [0] * n_readers
+    write_times = []
+
+    def reader(slot):
+        count = 0
+        while not stop.is_set():
+            target.read()
+            count += 1
+            time.sleep(read_interval)
+        reads[slot] = count
+
+    def writer(venue):
+        i = 0
+        while not stop.is_set():
+            book = dict(books[i % len(books)])
+            t0 = time.perf_counter()
+            target.publish(venue, book, 100)
+            write_times.append(time.perf_counter() - t0)
+            i += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(n_readers)]
+    threads += [threading.Thread(target=writer, args=(v,)) for v in ("nse", "bse")]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    write_times.sort()
+    p50 = write_times[len(write_times) // 2]
+    p99 = write_times[int(len(write_times) * 0.99)]
+    return sum(reads) / seconds, len(write_times) / seconds, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--levels", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--read-interval", type=float, default=0.001)
+    args = parser.parse_args()
+
+    for name, target in (("lock+copy", LockedBook()), ("snapshot", SnapshotBook())):
+        reads, writes, p50, p99 = run(target, args.readers, args.levels, args.seconds, args.read_interval)
+        print(
+            f"{name:<10} reads/s={reads:>12,.0f} writes/s={writes:>8,.0f} "
+            f"publish p50={p50 * 1e6:9.1f}us p99={p99 * 1e6:9.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Local stand-in for the exchange endpoints, serving recorded payloads so
+fetchers can be exercised and timed without network access.
+
+    python -m benchmarks.stub_server --nse-dir data/nse/api --port 8001
+
+BSE bid-detail pages are answered from a saved HTML file with an ETag,
+Last-Modified and optional gzip, like the real site.
+"""
+import os
+import gzip
+import hashlib
+import argparse
+import itertools
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+
+        if self.path.startswith("/api/"):
+            if server.require_cookie and server.require_cookie not in (self.headers.get("Cookie") or ""):
+                self.send_body(401, b"{}", "application/json")
+                return
+            if not server.nse_payloads:
+                self.send_body(404, b"{}", "application/json")
+                return
+            with server.lock:
+                body = next(server.nse_payloads)
+            self.send_body(200, body, "application/json")
+            return
+
+        if self.path.startswith("/markets/PublicIssues/") and server.bse_body:
+            if self.headers.get("If-None-Match") == server.bse_etag:
+                self.send_response(304)
+                self.send_header("ETag", server.bse_etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            body = server.bse_body
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", server.bse_etag)
+            self.send_header("Last-Modified", server.bse_last_modified)
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                body = server.bse_body_gzip
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_body(404, b"not found", "text/plain")
+
+
+def load_payloads(nse_dir):
+    if not nse_dir:
+        return None
+    names = sorted(n for n in os.listdir(nse_dir) if n.endswith(".json"))
+    bodies = []
+    for name in names:
+        with open(os.path.join(nse_dir, name), "rb") as f:
+            bodies.append(f.read())
+    return itertools.cycle(bodies) if bodies else None
+
+
+def set_bse_page(server, body):
+    server.bse_body = body
+    server.bse_body_gzip = gzip.compress(body) if body else None
+    server.bse_etag = f'"{hashlib.md5(body).hexdigest()}"' if body else None
+    server.bse_last_modified = formatdate(usegmt=True)
+
+
+def make_server(port=0, nse_dir=None, require_cookie=None, bse_html="bse.html"):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.nse_payloads = load_payloads(nse_dir)
+    server.require_cookie = require_cookie
+
+    body = None
+    if bse_html and os.path.exists(bse_html):
+        with open(bse_html, "rb") as f:
+            body = f.read()
+    set_bse_page(server, body)
+    return server
+
+
+def serve_in_background(**kwargs):
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--nse-dir", help="directory of recorded NSE API payloads (*.json), served in rotation")
+    parser.add_argument("--require-cookie", help="reject API calls whose Cookie header lacks this name")
+    parser.add_argument("--bse-html", default="bse.html", help="saved BSE bid-details page")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.nse_dir, args.require_cookie, args.bse_html)
+    print(f"Stub server on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
@@ -0,0 +1,141 @@
+"""
+Event-loop responsiveness of the API process under heavy BSE parse load,
+with parsing in threads (as OFSScraper.run_both does) against parsing in
+worker processes that publish through workers.BookRing.
+
+The loop's lag is measured by how late a 10 ms asyncio.sleep wakes up.
+
+    python -m benchmarks.worker_isolation --parsers 4 --seconds 5 --backend bs4
+"""
+import time
+import queue
+import asyncio
+import argparse
+import threading
+import multiprocessing as mp
+from bse_parsers import parse_bse_book
+from workers import BookRing
+
+
+def parse_loop(html, backend, stop, publish):
+    while not stop():
+        book, cutoff_qty = parse_bse_book(html, backend)
+        publish(book, cutoff_qty)
+
+
+def parse_worker(html, backend, ring_name, doorbell, stop):
+    ring = BookRing(ring_name)
+
+    def publish(book, cutoff_qty):
+        ring.write(book, cutoff_qty, time.time())
+        doorbell.put(ring_name)
+
+    try:
+        parse_loop(html, backend, lambda: stop.value, publish)
+    finally:
+        ring.close()
+
+
+async def measure_lag(seconds, interval=0.01):
+    lags = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - t0 - interval)
+    lags.sort()
+    return lags[len(lags) // 2], lags[int(len(lags) * 0.99)], lags[-1]
+
+
+def run_threads(html, backend, parsers, seconds):
+    stopped = threading.Event()
+    books = [0]
+
+    def publish(book, cutoff_qty):
+        books[0] += 1
+
+    threads = [
+        threading.Thread(target=parse_loop, args=(html, backend, stopped.is_set, publish))
+        for _ in range(parsers)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        lag = asyncio.run(measure_lag(seconds))
+    finally:
+        stopped.set()
+        for t in threads:
+            t.join()
+    return lag, books[0]
+
+
+def run_workers(html, backend, parsers, seconds):
+    ctx = mp.get_context("spawn")
+    doorbell = ctx.Queue()
+    stop = ctx.RawValue("b", 0)
+    rings = {}
+    for i in range(parsers):
+        ring = BookRing(f"ofs_bench_{mp.current_process().pid}_{i}", create=True)
+        rings[ring.name] = ring
+
+    procs = [
+        ctx.Process(target=parse_worker, args=(html, backend, name, doorbell, stop))
+        for name in rings
+    ]
+    for p in procs:
+        p.start()
+
+    # what WorkerScraper.supervise does: read the ring a doorbell points at
+    books = [0]
+    done = threading.Event()
+
+    def drain():
+        while not done.is_set():
+            try:
+                name = doorbell.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            rings[name].read()
+            books[0] += 1
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    try:
+        # let the workers finish importing before measuring
+        time.sleep(2)
+        books[0] = 0
+        lag = asyncio.run(measure_lag(seconds))
+        received = books[0]
+    finally:
+        stop.value = 1
+        for p in procs:
+            p.join(10)
+        done.set()
+        reader.join()
+        for ring in rings.values():
+            ring.close()
+            ring.unlink()
+    return lag, received
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parsers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--backend", default="bs4")
+    parser.add_argument("--bse-html", default="bse.html")
+    args = parser.parse_args()
+
+    with open(args.bse_html, encoding="utf-8") as f:
+        html = f.read()
+
+    for name, run in (("threads", run_threads), ("workers", run_workers)):
+        (p50, p99, worst), books = run(html, args.backend, args.parsers, args.seconds)
+        print(
+            f"{name:<8} loop lag p50={p50 * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms "
+            f"max={worst * 1000:7.2f}ms books/s={books / args.seconds:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Pre-serialized REST responses for GET /book.
+
+A book's version is its BookStream seq. Seqs restart at 0 with every
+process, so clients see it as an "<epoch>.<seq>" token (X-Book-Version,
+also inside the ETag), the epoch being random per process. The full body
+is the stream's JSON snapshot frame, the same bytes a WebSocket client
+gets on connect, and every body is encoded and gzipped at most once per
+version however often it is requested. ?since_version=<token> returns
+the deltas since that version merged into one:
+
+    {"v": 2, "type": "delta", "issue_id", "since_version", "seq", "changed": [[price, qty]], "removed": [price], "meta"}
+
+"removed" only names prices the client had at since_version: a level
+added and removed again in between is left out. Versions older than the
+kept history, or from another process, get the full snapshot instead.
+"""
+import gzip
+import uuid
+from collections import deque
+from protocol import PROTOCOL_VERSION, encode
+
+DEFAULT_HISTORY = 256
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class BookCache:
+    def __init__(self, issue_id, stream, book, history=DEFAULT_HISTORY, epoch=BOOT_ID):
+        self.issue_id = issue_id
+        self.stream = stream
+        self.book = book
+        self.epoch = epoch
+        self.history = deque(maxlen=history)
+        self.bodies = {}
+        # prices in the book as of the last recorded delta, to tell
+        # added levels from updated ones
+        self.known = set(book.columns()[0]) if len(book) else set()
+
+    @property
+    def version(self):
+        return self.stream.seq
+
+    def token(self, seq=None):
+        return f"{self.epoch}.{self.version if seq is None else seq}"
+
+    def parse_token(self, token):
+        """The seq a version token names, or None if it comes from another
+        process. ValueError if it is not a version token."""
+        epoch, dot, seq = token.partition(".")
+        if not dot or not epoch:
+            raise ValueError(f"Malformed version {token!r}")
+        seq = int(seq)
+        return seq if epoch == self.epoch else None
+
+    def etag(self):
+        return f'W/"{self.issue_id}-{self.token()}"'
+
+    def record(self):
+        """Keeps the stream's latest delta. Call after each publish."""
+        seq = self.stream.seq
+        if self.history and self.history[-1][0] == seq:
+            return
+        changed, removed = self.stream.changed, self.stream.removed
+        added = {price for price, _ in changed if price not in self.known}
+        self.known.update(added)
+        self.known.difference_update(removed)
+        self.history.append((seq, changed, removed, added))
+        self.bodies = {}
+
+    def covers(self, since):
+        """Whether the deltas after `since` are all still kept."""
+        return bool(self.history) and self.history[0][0] <= since + 1 and since < self.version
+
+    def merged_delta(self, since):
+        changed = {}
+        removed = set()
+        # whether the client had each touched price, from its first delta
+        had = {}
+        for seq, levels, gone, added in self.history:
+            if seq <= since:
+                continue
+            for price, qty in levels:
+                had.setdefault(price, price not in added)
+                changed[price] = qty
+                removed.discard(price)
+            for price in gone:
+                had.setdefault(price, True)
+                changed.pop(price, None)
+                if had[price]:
+                    removed.add(price)
+
+        return encode({
+            "v": PROTOCOL_VERSION,
+            "type": "delta",
+            "issue_id": self.issue_id,
+            "since_version": self.token(since),
+            "seq": self.version,
+            "changed": [[price, changed[price]] for price in sorted(changed, reverse=True)],
+            "removed": sorted(removed, reverse=True),
+            "meta": self.stream.meta,
+        })
+
+    def body(self, since=None, compress=False):
+        """Response bytes for the current version: the merged delta since
+        `since` if it is covered, else the full snapshot."""
+        if since is not None and not self.covers(since):
+            since = None
+
+        key = (since, compress)
+        body = self.bodies.get(key)
+        if body is None:
+            if compress:
+                body = gzip.compress(self.body(since), compresslevel=6, mtime=0)
+            elif since is None:
+                body = self.stream.snapshot_frame(self.book)
+            else:
+                body = self.merged_delta(since)
+            self.bodies[key] = body
+        return body
@@ -0,0 +1,214 @@
+import re
+import time
+import logging
+from urllib.parse import urlparse
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+logger = logging.getLogger("OFS")
+
+NSE_HOME_URL = "https://www.nseindia.com"
+NSE_OFS_URL = "https://www.nseindia.com/market-data/ofs-information"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_HOSTS = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+)
+
+# the OFS page is usable once the category tabs have rendered
+READY_SELECTOR = "text=Retail Category"
+
+
+def api_terms(api_name):
+    """Lowercase words of a refresh function name, "loadOfsGeneral" ->
+    ["ofs", "general"], that the URL it fetches is expected to contain."""
+    return [w.lower() for w in re.findall(r"[A-Z][a-z0-9]*", api_name)]
+
+
+def is_api_url(url, api_name):
+    """Whether `url` is the NSE API call behind refreshApi(api_name)
+    rather than one of the other /api/ endpoints the page polls."""
+    url = url.lower()
+    if "/api/" not in url:
+        return False
+    return api_name.lower() in url or all(term in url for term in api_terms(api_name))
+
+# Run before clicking a refresh link: clears resource timings, remembers
+# which API call the refresh makes (see is_api_url) and records when the
+# table (or anything around it) is re-rendered.
+ARM_REFRESH_JS = """
+([tableSelector, apiName, apiTerms]) => {
+    const previous = window.__ofsRefresh;
+    if (previous && previous.observer) previous.observer.disconnect();
+
+    const state = window.__ofsRefresh = { armedAt: performance.now(), changedAt: 0 };
+    const name = apiName.toLowerCase();
+    state.isApi = (url) => {
+        url = url.toLowerCase();
+        return url.includes("/api/") && (url.includes(name) || apiTerms.every((t) => url.includes(t)));
+    };
+    performance.clearResourceTimings();
+
+    const table = document.querySelector(tableSelector);
+    const target = table ? (table.parentElement || table) : document.body;
+    state.observer = new MutationObserver(() => { state.changedAt = performance.now(); });
+    state.observer.observe(target, { childList: true, subtree: true, characterData: true });
+}
+"""
+
+# True once the refresh's own API call has completed and the table was
+# re-rendered after it, or the response is graceMs old without a
+# re-render (unchanged data). Other /api/ calls the page makes meanwhile
+# do not count. If the call never shows up in the resource timings, the
+# table having changed and then stayed quiet for graceMs, at least
+# fallbackMs after the click, will do.
+REFRESH_READY_JS = """
+([graceMs, fallbackMs]) => {
+    const state = window.__ofsRefresh;
+    if (!state) return true;
+
+    const now = performance.now();
+    const response = performance.getEntriesByType("resource").find(
+        (e) => (e.initiatorType === "xmlhttprequest" || e.initiatorType === "fetch")
+            && state.isApi(e.name) && e.startTime >= state.armedAt
+    );
+    if (response) {
+        return state.changedAt >= response.responseEnd || now - response.responseEnd >= graceMs;
+    }
+    return state.changedAt > 0 && now - state.changedAt >= graceMs && now - state.armedAt >= fallbackMs;
+}
+"""
+
+
+def arm_refresh(page, table_selector, api_name):
+    """Call right before clicking the refresh link that calls
+    refreshApi(api_name); see wait_refreshed."""
+    page.evaluate(ARM_REFRESH_JS, [table_selector, api_name, api_terms(api_name)])
+
+
+def wait_refreshed(page, timeout=10000, grace=250, fallback=1000):
+    """Blocks until the refresh armed on `page` has been answered by NSE
+    and rendered, so a cycle takes as long as NSE does. If that cannot be
+    observed within `timeout` ms, waits `fallback` ms instead."""
+    try:
+        page.wait_for_function(REFRESH_READY_JS, arg=[grace, fallback], timeout=timeout, polling=50)
+    except PlaywrightTimeoutError:
+        logger.warning("NSE refresh readiness not observed in %dms, settling %dms", timeout, fallback)
+        page.wait_for_timeout(fallback)
+
+
+def is_blocked(request):
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request.url).hostname or ""
+    return host.endswith(BLOCKED_HOSTS)
+
+
+class BrowserPool:
+    """A single Chromium context holding pre-warmed NSE OFS pages.
+
+    Images, fonts, media and analytics are aborted at the routing layer,
+    so pages load and stay lighter. A page that crashed or lost its
+    session is replaced inside the same context; the browser itself is
+    only relaunched if the context has died.
+    """
+
+    def __init__(self, playwright, size=1, headless=True, user_data_dir="browser_profile"):
+        self.playwright = playwright
+        self.size = size
+        self.headless = headless
+        self.user_data_dir = user_data_dir
+
+        self.context = None
+        self.idle = []
+        self.crashed = set()
+
+    def launch(self):
+        start = time.time()
+        self.context = self.playwright.chromium.launch_persistent_context(
+            user_data_dir=self.user_data_dir,
+            headless=self.headless,
+            user_agent=USER_AGENT,
+            viewport={"width": 1920, "height": 1080},
+            extra_http_headers={"Accept-Language": "en-US,en;q=0.9"},
+            args=["--disable-blink-features=AutomationControlled"]
+        )
+        self.context.route("**/*", self.route)
+        logger.info("Browser launched | headless=%s | time=%.2fs", self.headless, time.time() - start)
+
+    def route(self, route):
+        if is_blocked(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    def start(self):
+        self.launch()
+        for _ in range(self.size):
+            self.idle.append(self.warm_page())
+
+    def warm_page(self):
+        start = time.time()
+        page = self.context.new_page()
+        page.on("crash", lambda p: self.crashed.add(id(p)))
+
+        page.goto(NSE_HOME_URL, wait_until="domcontentloaded", timeout=60000)
+        page.goto(NSE_OFS_URL, wait_until="domcontentloaded", timeout=60000)
+        page.wait_for_selector(READY_SELECTOR, timeout=30000)
+
+        logger.info("NSE page warmed | time=%.2fs", time.time() - start)
+        return page
+
+    def acquire(self):
+        while self.idle:
+            page = self.idle.pop()
+            if self.is_healthy(page):
+                return page
+            self.discard(page)
+        return self.warm_page()
+
+    def release(self, page):
+        self.idle.append(page)
+
+    def is_healthy(self, page):
+        if page.is_closed() or id(page) in self.crashed:
+            return False
+        if not page.url.startswith(NSE_OFS_URL):
+            return False
+        try:
+            page.evaluate("1")
+        except Exception:
+            return False
+        return True
+
+    def discard(self, page):
+        self.crashed.discard(id(page))
+        try:
+            page.close()
+        except Exception:
+            pass
+
+    def recycle(self, page):
+        """Replaces a broken page, relaunching only if the context is gone."""
+        self.discard(page)
+        try:
+            return self.warm_page()
+        except Exception:
+            logger.exception("Page warm-up failed, relaunching browser")
+            self.close()
+            self.launch()
+            return self.warm_page()
+
+    def close(self):
+        self.idle.clear()
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+            self.context = None
@@ -2,7 +2,7 @@ import os
 import csv
 from datetime import datetime
 import requests
-from bs4 import BeautifulSoup
+from bse_parsers import extract_rows
 
 def save_html_and_csv(url, save_dir="data/html"):
     """
@@ -27,21 +27,14 @@ def save_html_and_csv(url, save_dir="data/html"):
         
 
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
         # Find the data table (the one with bid details)
-        table = soup.find('table', {'cellpadding': '4', 'cellspacing': '1'})
+        rows = extract_rows(response.text)
         
-        if table:
+        if rows is not None:
             with open(csv_filename, 'w', encoding='utf-8', newline='') as f:
                 writer = csv.writer(f)
                 
-                # Extract all rows
-                rows = table.find_all('tr')
-                
-                for row in rows:
-                    cells = row.find_all('td')
-                    row_data = [cell.get_text(strip=True) for cell in cells]
+                for row_data in rows:
                     if row_data:  # Only write non-empty rows
                         writer.writerow(row_data)
             
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import httpx
+from bse_parsers import bid_table_html
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+logger = logging.getLogger("OFS")
+
+BSE_BASE_URL = "https://www.bseindia.com"
+BSE_BID_DETAILS_PATH = "/markets/PublicIssues/BSEBidDetails_ofs.aspx"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+class BSEClient:
+    """One long-lived pooled client for every BSE request. Remembers the
+    ETag / Last-Modified of each page and sends them back, so an unchanged
+    page costs a 304 instead of a full download. Servers that ignore the
+    validators are caught by a hash of the bid table: the rest of the page
+    (ASP.NET view state and the like) may change on every request."""
+
+    def __init__(self, base_url=BSE_BASE_URL, timeout=30, max_connections=10):
+        self.base_url = base_url
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=DEFAULT_HEADERS,
+            timeout=timeout,
+            http2=HTTP2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=120,
+            ),
+        )
+        self.validators = {}
+        self.digests = {}
+
+    def bid_details_params(self, scripcode, flag="R"):
+        return {"flag": flag, "Scripcode": scripcode}
+
+    async def fetch(self, scripcode, flag="R"):
+        """Returns the page HTML, or None if it has not changed since the
+        last fetch."""
+        key = (scripcode, flag)
+        headers = {}
+        etag, last_modified = self.validators.get(key, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        resp = await self.client.get(
+            BSE_BID_DETAILS_PATH,
+            params=self.bid_details_params(scripcode, flag),
+            headers=headers,
+        )
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+
+        html = resp.text
+        table = bid_table_html(html)
+        if table is None:
+            # nothing worth remembering; the caller's parse reports it
+            self.forget(scripcode, flag)
+            return html
+
+        self.validators[key] = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+
+        digest = hashlib.blake2b(table.encode(), digest_size=16).digest()
+        if self.digests.get(key) == digest:
+            return None
+        self.digests[key] = digest
+        return html
+
+    def forget(self, scripcode, flag="R"):
+        """Drops the validators and digest of a page, so its next fetch
+        is parsed again. Call when a returned page could not be parsed."""
+        key = (scripcode, flag)
+        self.validators.pop(key, None)
+        self.digests.pop(key, None)
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,120 @@
+import re
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# The bid table is the only one on the page with these attributes, and it
+# has no nested tables, so its byte range can be cut out with a regex.
+TABLE_START_RE = re.compile(r'<table\b[^>]*\bcellpadding="4"[^>]*\bcellspacing="1"[^>]*>', re.I)
+TABLE_END_RE = re.compile(r"</table\s*>", re.I)
+
+if lxml is not None:
+    TABLE_ROWS_XPATH = etree.XPath('//table[@cellpadding="4" and @cellspacing="1"]//tr')
+    FRAGMENT_ROWS_XPATH = etree.XPath("//tr")
+
+SELECTOLAX_TABLE_CSS = 'table[cellpadding="4"][cellspacing="1"]'
+
+
+def rows_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", {"cellpadding": "4", "cellspacing": "1"})
+    if not table:
+        return None
+    return [
+        [cell.get_text(strip=True) for cell in row.find_all("td")]
+        for row in table.find_all("tr")
+    ]
+
+
+def rows_lxml(html):
+    rows = TABLE_ROWS_XPATH(lxml.html.fromstring(html))
+    if not rows:
+        return None
+    return [[td.text_content().strip() for td in row.iterchildren("td")] for row in rows]
+
+
+def rows_selectolax(html):
+    table = HTMLParser(html).css_first(SELECTOLAX_TABLE_CSS)
+    if table is None:
+        return None
+    return [
+        [td.text(strip=True) for td in row.css("td")]
+        for row in table.css("tr")
+    ]
+
+
+def bid_table_html(html):
+    """The bid table's markup, or None if the page has none."""
+    start = TABLE_START_RE.search(html)
+    if not start:
+        return None
+    end = TABLE_END_RE.search(html, start.end())
+    if not end:
+        return None
+    return html[start.start():end.end()]
+
+
+def rows_slice(html):
+    table = bid_table_html(html)
+    if table is None:
+        return None
+
+    fragment = lxml.html.fragment_fromstring(table)
+    return [[td.text_content().strip() for td in row.iterchildren("td")] for row in FRAGMENT_ROWS_XPATH(fragment)]
+
+
+BACKENDS = {"bs4": rows_bs4}
+if lxml is not None:
+    BACKENDS["lxml"] = rows_lxml
+    BACKENDS["slice"] = rows_slice
+if HTMLParser is not None:
+    BACKENDS["selectolax"] = rows_selectolax
+
+
+def default_backend():
+    for name in ("selectolax", "slice", "lxml"):
+        if name in BACKENDS:
+            return name
+    return "bs4"
+
+
+def extract_rows(html, backend=None):
+    """Cell texts of every row of the bid table, or None if the page has
+    no bid table."""
+    return BACKENDS[backend or default_backend()](html)
+
+
+def parse_int(val):
+    return int(val.replace(",", "").replace('"', "").strip())
+
+
+def rows_to_book(rows):
+    book = {}
+    cutoff_qty = None
+    for cells in rows:
+        try:
+            raw_price = cells[0]
+            if raw_price.lower().startswith("cut"):
+                if cutoff_qty is None:
+                    cutoff_qty = parse_int(cells[2])
+                continue
+            book[float(raw_price)] = parse_int(cells[2])
+        except (IndexError, ValueError):
+            continue
+    return book, cutoff_qty
+
+
+def parse_bse_book(html, backend=None):
+    rows = extract_rows(html, backend)
+    if rows is None:
+        return None
+    return rows_to_book(rows)
@@ -0,0 +1,163 @@
+"""
+Vectorized demand curve: each venue's book is a pair of aligned NumPy
+arrays (prices ascending, int64 quantities) and the merged curve is
+rebuilt with array operations instead of per-level Python work.
+
+    merge       sorted union of venue prices, quantities summed per price
+    cumulative  reversed cumsum (high to low)
+    cutoff      searchsorted of the issue size into the cumulative sums
+"""
+import numpy as np
+
+EMPTY_PRICES = np.empty(0, dtype=np.float64)
+EMPTY_QTY = np.empty(0, dtype=np.int64)
+
+
+def venue_arrays(levels):
+    """{price: qty} -> (prices ascending, qty)."""
+    if not levels:
+        return EMPTY_PRICES, EMPTY_QTY
+    prices = np.fromiter(levels.keys(), dtype=np.float64, count=len(levels))
+    qty = np.fromiter(levels.values(), dtype=np.int64, count=len(levels))
+    order = np.argsort(prices, kind="stable")
+    return prices[order], qty[order]
+
+
+def merge_arrays(*venues):
+    """Sorted union of (prices, qty) pairs with quantities summed at equal
+    prices. Returns (prices ascending, qty)."""
+    venues = [v for v in venues if len(v[0])]
+    if not venues:
+        return EMPTY_PRICES, EMPTY_QTY
+    if len(venues) == 1:
+        return venues[0]
+
+    prices = np.concatenate([p for p, _ in venues])
+    qty = np.concatenate([q for _, q in venues])
+    order = np.argsort(prices, kind="stable")
+    prices = prices[order]
+    qty = qty[order]
+
+    starts = np.flatnonzero(np.concatenate(([True], prices[1:] != prices[:-1])))
+    return prices[starts], np.add.reduceat(qty, starts)
+
+
+def cumulative_desc(prices, qty):
+    """(prices, qty, cumulative) ordered high to low."""
+    prices = prices[::-1]
+    qty = qty[::-1]
+    return prices, qty, np.cumsum(qty)
+
+
+def cutoff_index(cumulative, issue_size):
+    i = int(np.searchsorted(cumulative, issue_size, side="left"))
+    return i if i < len(cumulative) else None
+
+
+def merge_price_qty(nse, bse, floor_price, floor_qty):
+    """Vectorized server.merge_price_qty, returning arrays."""
+    floor = ({float(floor_price): floor_qty} if floor_qty > 0 else {})
+    return merge_arrays(venue_arrays(nse), venue_arrays(bse), venue_arrays(floor))
+
+
+def cumulative_high_to_low(prices, qty, issue_size):
+    """Vectorized server.cumulative_high_to_low: columnar payload and
+    cutoff price."""
+    prices, qty, cumulative = cumulative_desc(prices, qty)
+    i = cutoff_index(cumulative, issue_size)
+    payload = {
+        "price": prices.tolist(),
+        "qty": qty.tolist(),
+        "cumulative_qty": cumulative.tolist(),
+    }
+    return payload, (float(prices[i]) if i is not None else None)
+
+
+class VectorBook:
+    """OrderBook with the same interface, backed by per-venue arrays.
+
+    A venue update replaces that venue's arrays; the merged curve and its
+    running total are rebuilt lazily on the next read. Changed prices for
+    deltas are found by diffing the merged curve against the one last
+    drained.
+    """
+
+    def __init__(self, issue_size):
+        self.issue_size = issue_size
+        self.arrays = {}
+
+        self.version = 0
+        self.ascending = None
+        self.curve = None
+        self.drained = (EMPTY_PRICES, EMPTY_QTY)
+
+    def __len__(self):
+        return len(self.merged()[0])
+
+    def update_venue(self, venue, levels):
+        """Replaces a venue's arrays. Returns 1 if the venue changed,
+        else 0."""
+        prices, qty = venue_arrays(levels)
+        old_prices, old_qty = self.arrays.get(venue, (EMPTY_PRICES, EMPTY_QTY))
+        if np.array_equal(prices, old_prices) and np.array_equal(qty, old_qty):
+            return 0
+
+        self.arrays[venue] = (prices, qty)
+        self.version += 1
+        self.ascending = None
+        self.curve = None
+        return 1
+
+    def merged(self):
+        """(prices desc, qty, cumulative) of the current curve."""
+        if self.curve is None:
+            self.ascending = merge_arrays(*self.arrays.values())
+            self.curve = cumulative_desc(*self.ascending)
+        return self.curve
+
+    def drain_changes(self):
+        self.merged()
+        new_prices, new_qty = self.ascending
+        old_prices, old_qty = self.drained
+        self.drained = (new_prices, new_qty)
+
+        if np.array_equal(old_prices, new_prices):
+            return set(new_prices[old_qty != new_qty].tolist())
+
+        union = np.union1d(old_prices, new_prices)
+        old = np.full(len(union), -1, dtype=np.int64)
+        new = np.full(len(union), -1, dtype=np.int64)
+        old[np.searchsorted(union, old_prices)] = old_qty
+        new[np.searchsorted(union, new_prices)] = new_qty
+        return set(union[old != new].tolist())
+
+    def level_qty(self, price):
+        self.merged()
+        prices, qty = self.ascending
+        i = int(np.searchsorted(prices, price))
+        if i < len(prices) and prices[i] == price:
+            return int(qty[i])
+        return None
+
+    def cutoff_price(self):
+        prices, _, cumulative = self.merged()
+        i = cutoff_index(cumulative, self.issue_size)
+        return float(prices[i]) if i is not None else None
+
+    def total_demand(self):
+        cumulative = self.merged()[2]
+        return int(cumulative[-1]) if len(cumulative) else 0
+
+    def top_price(self):
+        prices = self.merged()[0]
+        return float(prices[0]) if len(prices) else None
+
+    def columns(self):
+        return self.merged()
+
+    def levels(self):
+        prices, qty, cumulative = self.merged()
+        return [
+            {"price": p, "qty": q, "cumulative_qty": c}
+            for p, q, c in zip(prices.tolist(), qty.tolist(), cumulative.tolist())
+        ]
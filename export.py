@@ -0,0 +1,194 @@
+"""
+Streaming export of NSE OFS scrapes.
+
+nse.py hands rows to an OfsExport as it extracts them and each row is
+encoded once and written straight to every sink, so a scrape is never
+held in memory as a whole:
+
+  - ofs_data_latest.ndjson       the scrape as NDJSON records
+  - ofs_summary_latest.csv       one row per company
+  - ofs_bid_details_latest.csv   one row per bid detail
+  - archive/ofs_<day>.ndjson.gz  every scrape of the (UTC) day, one gzip
+                                 member per scrape
+
+The *_latest files are written to a temporary file next to them and
+renamed into place on commit, so readers see either the previous scrape
+or the new one, never a partial file. NDJSON records:
+
+    {"type": "scrape", "timestamp", "scraped_at"}
+    {"type": "company", "company_name", "ltp", ...}
+    {"type": "bid", "company_name", "price_interval", "no_of_bids", ...}
+"""
+import os
+import csv
+import gzip
+import json
+import zlib
+from datetime import datetime, timezone
+
+SUMMARY_HEADER = [
+    "Company", "LTP", "Floor Price", "Indicative Price", "Base Issue Size", "Total Issue Size",
+    "Cumulative 100%", "Cumulative 0%", "Total Qty", "Times Base", "Times Total", "NSE Demand",
+]
+SUMMARY_FIELDS = [
+    "company_name", "ltp", "floor_price", "indicative_price", "base_issue_size", "total_issue_size",
+    "cumulative_qty_100pc", "cumulative_qty_0pc", "total_qty", "times_base", "times_total", "nse_demand",
+]
+
+BID_HEADER = [
+    "Company", "Price Interval", "No. of Bids",
+    "Qty Confirmed", "Qty Yet to Confirm", "Qty Total",
+    "Cumulative Confirmed", "Cumulative Yet to Confirm", "Cumulative Total",
+]
+BID_FIELDS = [
+    "price_interval", "no_of_bids",
+    "qty_confirmed", "qty_yet_to_confirm", "qty_total",
+    "cumulative_confirmed", "cumulative_yet_to_confirm", "cumulative_total",
+]
+
+
+NDJSON_LATEST = "ofs_data_latest.ndjson"
+SUMMARY_LATEST = "ofs_summary_latest.csv"
+BID_LATEST = "ofs_bid_details_latest.csv"
+ARCHIVE_SUFFIX = ".ndjson.gz"
+
+
+def add_bid(book, bid):
+    """Adds a bid detail row to {price: confirmed qty}, skipping rows
+    without a numeric price (e.g. cut-off). Confirmed qty is what the live
+    scraper serves, so stored and replayed books mean the same thing."""
+    try:
+        price = float(bid["price_interval"].replace(",", ""))
+        qty = int(bid["qty_confirmed"].replace(",", ""))
+    except ValueError:
+        return
+    book[price] = book.get(price, 0) + qty
+
+
+def bid_book(company):
+    """{price: total qty} from a company's bid detail rows, as in the
+    ofs_data_*.json dumps nse.py used to write."""
+    book = {}
+    for bid in company["bid_details"]:
+        add_bid(book, bid)
+    return book
+
+
+class AtomicFile:
+    """A text file written under a temporary name and renamed over `path`
+    on commit. abort() leaves the existing file untouched."""
+
+    def __init__(self, path, newline=None):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.file = open(self.tmp_path, "w", encoding="utf-8", newline=newline)
+
+    def write(self, text):
+        self.file.write(text)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class OfsExport:
+    def __init__(self, save_dir, timestamp, scraped_at, archive=True):
+        self.save_dir = save_dir
+        self.companies = 0
+        self.bids = 0
+
+        self.ndjson = AtomicFile(os.path.join(save_dir, NDJSON_LATEST))
+        self.summary_file = AtomicFile(os.path.join(save_dir, SUMMARY_LATEST), newline="")
+        self.bid_file = AtomicFile(os.path.join(save_dir, BID_LATEST), newline="")
+        self.summary = csv.writer(self.summary_file)
+        self.bid_rows = csv.writer(self.bid_file)
+        self.summary.writerow(SUMMARY_HEADER)
+        self.bid_rows.writerow(BID_HEADER)
+
+        # one gzip member per scrape, appended to the day's archive
+        self.archive = None
+        if archive:
+            archive_dir = os.path.join(save_dir, "archive")
+            os.makedirs(archive_dir, exist_ok=True)
+            day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            self.archive_path = os.path.join(archive_dir, f"ofs_{day}{ARCHIVE_SUFFIX}")
+            self.archive = zlib.compressobj(6, zlib.DEFLATED, 31)
+            self.archived = []
+
+        self.record({"type": "scrape", "timestamp": timestamp, "scraped_at": scraped_at})
+
+    @property
+    def paths(self):
+        paths = [self.ndjson.path, self.summary_file.path, self.bid_file.path]
+        if self.archive is not None:
+            paths.append(self.archive_path)
+        return paths
+
+    def record(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self.ndjson.write(line)
+        if self.archive is not None:
+            chunk = self.archive.compress(line.encode("utf-8"))
+            if chunk:
+                self.archived.append(chunk)
+
+    def company(self, company):
+        self.record({"type": "company", **company})
+        self.summary.writerow([company[field] for field in SUMMARY_FIELDS])
+        self.companies += 1
+
+    def bid(self, company_name, bid):
+        self.record({"type": "bid", "company_name": company_name, **bid})
+        self.bid_rows.writerow([company_name] + [bid[field] for field in BID_FIELDS])
+        self.bids += 1
+
+    def commit(self):
+        if self.archive is not None:
+            # the member is only appended once complete, so an aborted
+            # scrape never leaves a truncated member in the archive
+            self.archived.append(self.archive.flush())
+            with open(self.archive_path, "ab") as f:
+                f.writelines(self.archived)
+        for sink in (self.ndjson, self.summary_file, self.bid_file):
+            sink.commit()
+
+    def abort(self):
+        for sink in (self.ndjson, self.summary_file, self.bid_file):
+            sink.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def read_scrapes(path):
+    """(scraped_at, {company_name: book}) per scrape in an NDJSON export
+    or a .ndjson.gz archive."""
+    opener = gzip.open if path.endswith(".gz") else open
+    scraped_at, books = None, {}
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record["type"]
+            if kind == "scrape":
+                if scraped_at is not None:
+                    yield scraped_at, books
+                scraped_at, books = record["scraped_at"], {}
+            elif kind == "company":
+                books[record["company_name"]] = {}
+            elif kind == "bid":
+                add_bid(books.setdefault(record["company_name"], {}), record)
+    if scraped_at is not None:
+        yield scraped_at, books
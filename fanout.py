@@ -0,0 +1,132 @@
+import time
+import asyncio
+import logging
+from functools import lru_cache
+from collections import deque
+from metrics import SEND_SECONDS
+from protocol import DEFAULT_ENCODING
+
+logger = logging.getLogger("WS")
+
+CLIENT_QUEUE_SIZE = 8
+SEND_TIMEOUT = 5.0
+
+stats = {"frames_sent": 0, "frames_dropped": 0, "clients_evicted": 0}
+
+# encodings sent as binary WebSocket messages; JSON goes out as text
+BINARY_ENCODINGS = ("packed", "msgpack")
+
+
+@lru_cache(maxsize=64)
+def text_frame(frame):
+    """A JSON frame as str, decoded once however many clients get it (the
+    frame bytes are shared, and bytes cache their hash)."""
+    return frame.decode()
+
+
+class ClientConnection:
+    """One WebSocket client with its own bounded outbound queue and writer
+    task, so a slow socket only delays itself.
+
+    Deltas depend on every earlier delta, so an overflowing queue is not
+    trimmed frame by frame: it is emptied and the client is marked for a
+    snapshot, which the writer fetches fresh when it next runs. A slow
+    consumer therefore skips straight to the latest book.
+    """
+
+    def __init__(
+        self, ws, issue_id, snapshot, max_queue=CLIENT_QUEUE_SIZE, send_timeout=SEND_TIMEOUT, encoding=DEFAULT_ENCODING
+    ):
+        self.ws = ws
+        self.issue_id = issue_id
+        self.snapshot = snapshot
+        self.encoding = encoding
+        # the views.View this client is subscribed to, set by the server
+        self.view = None
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.needs_snapshot = True
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, frame):
+        if self.closed:
+            return
+        if self.needs_snapshot:
+            self.ready.set()
+            return
+
+        if len(self.queue) >= self.max_queue:
+            self.dropped += len(self.queue) + 1
+            stats["frames_dropped"] += len(self.queue) + 1
+            self.queue.clear()
+            self.needs_snapshot = True
+        else:
+            self.queue.append(frame)
+        self.ready.set()
+
+    def request_snapshot(self):
+        self.needs_snapshot = True
+        self.ready.set()
+
+    def next_frame(self):
+        if self.needs_snapshot:
+            frame = self.snapshot()
+            if frame is None:
+                return None
+            self.needs_snapshot = False
+            self.queue.clear()
+            return frame
+
+        return self.queue.popleft() if self.queue else None
+
+    async def run(self):
+        while not self.closed:
+            frame = self.next_frame()
+            if frame is None:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+
+            start = time.perf_counter()
+            try:
+                if self.encoding in BINARY_ENCODINGS:
+                    send = self.ws.send_bytes(frame)
+                else:
+                    send = self.ws.send_text(text_frame(frame))
+                await asyncio.wait_for(send, self.send_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Evicting stuck client %s | issue=%s", id(self.ws), self.issue_id)
+                stats["clients_evicted"] += 1
+                await self.close(code=1013)
+                return
+            except Exception:
+                await self.close()
+                return
+
+            SEND_SECONDS.observe(time.perf_counter() - start)
+            self.sent += 1
+            stats["frames_sent"] += 1
+
+    async def close(self, code=1000):
+        if self.closed:
+            return
+        self.closed = True
+        self.ready.set()
+        try:
+            await asyncio.wait_for(self.ws.close(code=code), 1.0)
+        except Exception:
+            pass
+
+
+def queue_depths(connections):
+    depths = [len(c.queue) for c in connections]
+    return {
+        "max": max(depths, default=0),
+        "avg": round(sum(depths) / len(depths), 2) if depths else 0.0,
+    }
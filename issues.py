@@ -0,0 +1,53 @@
+import os
+import json
+from dataclasses import dataclass, asdict
+
+ISSUES_FILE = os.environ.get("OFS_ISSUES_FILE", "issues.json")
+
+
+@dataclass(frozen=True)
+class Issue:
+    issue_id: str
+    scripcode: str
+    nse_name: str
+    issue_size: int
+    floor_price: float
+    retail: bool = True
+
+    @property
+    def bse_flag(self):
+        return "R" if self.retail else "NR"
+
+    @property
+    def nse_category(self):
+        return "retail" if self.retail else "general"
+
+    def to_dict(self):
+        return asdict(self)
+
+
+DEFAULT_ISSUES = [
+    Issue(
+        issue_id="HINDZINC",
+        scripcode="500188",
+        nse_name="Hindustan Zinc Limited",
+        issue_size=4_757_707,
+        floor_price=685,
+        retail=True,
+    ),
+]
+
+
+def load_issues(path=ISSUES_FILE):
+    """Active issues from a JSON list of Issue fields, or the defaults
+    when the file does not exist."""
+    if not os.path.exists(path):
+        return list(DEFAULT_ISSUES)
+
+    with open(path, encoding="utf-8") as f:
+        issues = [Issue(**item) for item in json.load(f)]
+
+    ids = [i.issue_id for i in issues]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate issue_id in {path}")
+    return issues
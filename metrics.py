@@ -0,0 +1,131 @@
+"""
+Minimal Prometheus text-format metrics, cheap enough for the hot paths.
+
+observe() is a bisect and three additions on plain Python numbers, with
+no lock: updates from scraper threads can in rare cases lose an
+increment, which is acceptable for monitoring. Gauges are computed by
+callbacks at scrape time, so they cost nothing between scrapes.
+
+Metrics recorded inside worker processes (OFS_SOURCE=workers) stay in
+those processes.
+"""
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REGISTRY = []
+
+
+def escape_label(value):
+    """A label value escaped per the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = Series(self.buckets)
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def time(self, *labels):
+        return Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series.counts):
+                cumulative += count
+                le = format_labels(self.labels, labels, ("le", format_value(bound)))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            base = format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{base} {format_value(series.sum)}")
+            lines.append(f"{self.name}_count{base} {series.count}")
+        return lines
+
+
+class Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Gauge:
+    """Value(s) computed at scrape time by `collect`, which returns
+    {label values tuple: value}. kind="counter" exposes a running total
+    kept elsewhere."""
+
+    def __init__(self, name, help, labels=(), collect=None, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.collect().items():
+            if value is not None:
+                lines.append(f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+FETCH_SECONDS = Histogram("ofs_fetch_seconds", "Time to fetch one venue page or payload.", ("venue",))
+PARSE_SECONDS = Histogram("ofs_parse_seconds", "Time to turn a fetched page into a book.", ("venue",))
+COMPUTE_SECONDS = Histogram("ofs_compute_seconds", "Merge, cumulative and metrics time per broadcast.", ("issue_id",))
+FRAME_BYTES = Histogram("ofs_frame_bytes", "Encoded WebSocket frame size.", ("type", "encoding"), buckets=SIZE_BUCKETS)
+SEND_SECONDS = Histogram("ofs_client_send_seconds", "Time to hand one frame to a client socket.")
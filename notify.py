@@ -0,0 +1,51 @@
+import time
+import asyncio
+
+
+class UpdateSignal:
+    """Thread-safe bridge from scraper publishes into the asyncio loop.
+
+    Scraper threads call notify(); the broadcaster awaits wait(). Each
+    pending issue remembers the time of its oldest unbroadcast publish, so
+    publish-to-send latency can be measured.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.event = None
+        self.pending = {}
+
+    def bind(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def notify(self, issue_id, ts=None):
+        if self.loop is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.mark, issue_id, ts or time.time())
+        except RuntimeError:
+            # loop already closed during shutdown
+            pass
+
+    def mark(self, issue_id, ts):
+        self.pending.setdefault(issue_id, ts)
+        self.event.set()
+
+    async def wait(self, timeout=None, coalesce=0.0):
+        """Waits for the next publish, then optionally lingers `coalesce`
+        seconds so a burst is handled in one pass. Returns
+        {issue_id: oldest publish ts}; empty on timeout."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        if coalesce and self.event.is_set():
+            await asyncio.sleep(coalesce)
+        return self.drain()
+
+    def drain(self):
+        self.event.clear()
+        pending, self.pending = self.pending, {}
+        return pending
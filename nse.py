@@ -1,60 +1,60 @@
 import os
-import json
-import csv
+import re
 from datetime import datetime
 from playwright.sync_api import sync_playwright
+from browser_pool import BrowserPool, arm_refresh, wait_refreshed
+from issues import load_issues
+from store import BookStore
+from export import OfsExport, add_bid
 import time
 
+
+# pause between refreshes; page readiness itself is event driven
+REFRESH_INTERVAL = 2
+
+
+def store_key(company_name, issue_ids, reserved):
+    """The store issue of a General Category company: its configured
+    issue, or a key derived from the name that never matches another
+    issue's id, so a retail book's history is not mixed in."""
+    name = company_name.strip().lower()
+    if name in issue_ids:
+        return issue_ids[name]
+    key = re.sub(r"[^A-Za-z0-9]+", "_", company_name).strip("_").upper()
+    while key in reserved:
+        key += "_GENERAL"
+    return key
+
+
 def scrape_nse_ofs():
     """Scrape NSE OFS data and save to files"""
-    URL = "https://www.nseindia.com/market-data/ofs-information"
     SAVE_DIR = "data/nse"
     
     os.makedirs(SAVE_DIR, exist_ok=True)
+
+    # per-refresh history goes to the store instead of timestamped files
+    store = BookStore(os.environ.get("OFS_STORE_DIR", "data/store"), latest_dir=os.environ.get("OFS_LATEST_DIR", "data") or None)
+    issues = load_issues()
+    issue_ids = {i.nse_name.strip().lower(): i.issue_id for i in issues if i.nse_category == "general"}
+    reserved = {i.issue_id for i in issues}
     
     print(f"\n{'='*60}")
     print(f"Starting NSE OFS Scraper - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
     
     with sync_playwright() as p:
-        # ✅ Better browser setup to avoid detection
-        context = p.chromium.launch_persistent_context(
-            user_data_dir="browser_profile",
-            headless=False,  # Set to True once working
-            viewport={"width": 1920, "height": 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--disable-features=IsolateOrigins,site-per-process",
-                "--disable-site-isolation-trials"
-            ]
-        )
-        
-        page = context.new_page()
-        
-        # ✅ Set extra headers to look more like a real browser
-        page.set_extra_http_headers({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0'
-        })
+        # ✅ Headless pool with images, fonts and analytics blocked
+        pool = BrowserPool(p, headless=True)
         
         try:
             print("📡 Connecting to NSE...")
+            pool.launch()
             
             max_retries = 3
             for attempt in range(max_retries):
                 try:
-                    page.goto("https://www.nseindia.com", 
-                             wait_until="domcontentloaded",  # Less strict than "load"
-                             timeout=60000)
-                    print("✓ Homepage loaded")
+                    page = pool.acquire()
+                    print("✓ OFS page loaded")
                     break
                 except Exception as e:
                     if attempt < max_retries - 1:
@@ -63,23 +63,18 @@ def scrape_nse_ofs():
                     else:
                         raise e
             
-            page.wait_for_timeout(5000) 
-            
-            print("🔄 Loading OFS page...")
-            page.goto(URL, wait_until="domcontentloaded", timeout=60000)
-            page.wait_for_timeout(5000)
-            
             print("📊 Opening General Category...")
             page.click("text=General Category", timeout=15000)
-            page.wait_for_timeout(3000)
+            page.wait_for_selector("#ofsGeneralTable", state="attached", timeout=30000)
             
             print("🔄 Refreshing data...")
             while(True) :
+                arm_refresh(page, "#ofsGeneralTable", "loadOfsGeneral")
                 page.click("a[onclick=\"refreshApi('loadOfsGeneral')\"]", timeout=15000)
                 
                 print("⏳ Waiting for data to load...")
+                wait_refreshed(page)
                 page.wait_for_selector("#ofsGeneralTable tbody tr", timeout=30000)
-                page.wait_for_timeout(3000)
                 
                 # Get timestamp
                 timestamp_elem = page.query_selector(".asondate span")
@@ -87,134 +82,84 @@ def scrape_nse_ofs():
                 
                 print(f"📅 Data timestamp: {data_timestamp}")
                 
-                ofs_data = {
-                    "timestamp": data_timestamp,
-                    "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "companies": []
-                }
-                
-                # Extract data
-                all_rows = page.query_selector_all("#ofsGeneralTable tbody tr")
-                
-                i = 0
-                while i < len(all_rows):
-                    row = all_rows[i]
+                # Rows go straight to the export sinks as they are read;
+                # only each company's aggregated book is kept for the store
+                books = {}
+                with OfsExport(SAVE_DIR, data_timestamp, datetime.now().strftime("%Y-%m-%d %H:%M:%S")) as export:
+                    all_rows = page.query_selector_all("#ofsGeneralTable tbody tr")
                     
-                    if "accordActive" in row.get_attribute("class"):
-                        cells = row.query_selector_all("td")
+                    i = 0
+                    while i < len(all_rows):
+                        row = all_rows[i]
                         
-                        if len(cells) > 1:
-                            company_data = {
-                                "company_name": cells[1].inner_text().strip(),
-                                "ltp": cells[2].inner_text().strip(),
-                                "floor_price": cells[3].inner_text().strip(),
-                                "indicative_price": cells[4].inner_text().strip(),
-                                "base_issue_size": cells[5].inner_text().strip(),
-                                "total_issue_size": cells[6].inner_text().strip(),
-                                "cumulative_qty_100pc": cells[7].inner_text().strip(),
-                                "cumulative_qty_0pc": cells[8].inner_text().strip(),
-                                "total_qty": cells[9].inner_text().strip(),
-                                "times_base": cells[10].inner_text().strip(),
-                                "times_total": cells[11].inner_text().strip(),
-                                "nse_demand": cells[12].inner_text().strip(),
-                                "bid_details": []
-                            }
+                        if "accordActive" in row.get_attribute("class"):
+                            cells = row.query_selector_all("td")
                             
-                            if i + 1 < len(all_rows):
-                                next_row = all_rows[i + 1]
-                                detail_td = next_row.query_selector("td.accordTD")
+                            if len(cells) > 1:
+                                company_data = {
+                                    "company_name": cells[1].inner_text().strip(),
+                                    "ltp": cells[2].inner_text().strip(),
+                                    "floor_price": cells[3].inner_text().strip(),
+                                    "indicative_price": cells[4].inner_text().strip(),
+                                    "base_issue_size": cells[5].inner_text().strip(),
+                                    "total_issue_size": cells[6].inner_text().strip(),
+                                    "cumulative_qty_100pc": cells[7].inner_text().strip(),
+                                    "cumulative_qty_0pc": cells[8].inner_text().strip(),
+                                    "total_qty": cells[9].inner_text().strip(),
+                                    "times_base": cells[10].inner_text().strip(),
+                                    "times_total": cells[11].inner_text().strip(),
+                                    "nse_demand": cells[12].inner_text().strip(),
+                                }
+                                company_name = company_data["company_name"]
+                                export.company(company_data)
+                                book = books.setdefault(company_name, {})
+                                bids = 0
                                 
-                                if detail_td:
-                                    detail_table = detail_td.query_selector("table tbody")
+                                if i + 1 < len(all_rows):
+                                    next_row = all_rows[i + 1]
+                                    detail_td = next_row.query_selector("td.accordTD")
                                     
-                                    if detail_table:
-                                        detail_rows = detail_table.query_selector_all("tr")
+                                    if detail_td:
+                                        detail_table = detail_td.query_selector("table tbody")
                                         
-                                        for detail_row in detail_rows:
-                                            detail_cells = detail_row.query_selector_all("td")
+                                        if detail_table:
+                                            detail_rows = detail_table.query_selector_all("tr")
                                             
-                                            if len(detail_cells) >= 8:
-                                                bid_detail = {
-                                                    "price_interval": detail_cells[0].inner_text().strip(),
-                                                    "no_of_bids": detail_cells[1].inner_text().strip(),
-                                                    "qty_confirmed": detail_cells[2].inner_text().strip(),
-                                                    "qty_yet_to_confirm": detail_cells[3].inner_text().strip(),
-                                                    "qty_total": detail_cells[4].inner_text().strip(),
-                                                    "cumulative_confirmed": detail_cells[5].inner_text().strip(),
-                                                    "cumulative_yet_to_confirm": detail_cells[6].inner_text().strip(),
-                                                    "cumulative_total": detail_cells[7].inner_text().strip()
-                                                }
-                                                company_data["bid_details"].append(bid_detail)
-                                    
-                                    i += 1
-                            
-                            ofs_data["companies"].append(company_data)
-                            print(f"  ✓ {company_data['company_name']}: {len(company_data['bid_details'])} bids")
-                    
-                    i += 1
-                
-                # Save files with FIXED NAMES for easy access
-                timestamp_file = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                
-                # JSON - both timestamped and latest
-                json_filename = f"{SAVE_DIR}/ofs_data_{timestamp_file}.json"
-                json_latest = f"{SAVE_DIR}/ofs_data_latest.json"
-                
-                with open(json_filename, "w", encoding="utf-8") as f:
-                    json.dump(ofs_data, f, indent=2, ensure_ascii=False)
-                with open(json_latest, "w", encoding="utf-8") as f:
-                    json.dump(ofs_data, f, indent=2, ensure_ascii=False)
-                
-                # Summary CSV
-                csv_filename = f"{SAVE_DIR}/ofs_summary_{timestamp_file}.csv"
-                csv_latest = f"{SAVE_DIR}/ofs_summary_latest.csv"
-                
-                for filename in [csv_filename, csv_latest]:
-                    with open(filename, "w", encoding="utf-8") as f:
-                        f.write("Company,LTP,Floor Price,Indicative Price,Base Issue Size,Total Issue Size,")
-                        f.write("Cumulative 100%,Cumulative 0%,Total Qty,Times Base,Times Total,NSE Demand\n")
+                                            for detail_row in detail_rows:
+                                                detail_cells = detail_row.query_selector_all("td")
+                                                
+                                                if len(detail_cells) >= 8:
+                                                    bid_detail = {
+                                                        "price_interval": detail_cells[0].inner_text().strip(),
+                                                        "no_of_bids": detail_cells[1].inner_text().strip(),
+                                                        "qty_confirmed": detail_cells[2].inner_text().strip(),
+                                                        "qty_yet_to_confirm": detail_cells[3].inner_text().strip(),
+                                                        "qty_total": detail_cells[4].inner_text().strip(),
+                                                        "cumulative_confirmed": detail_cells[5].inner_text().strip(),
+                                                        "cumulative_yet_to_confirm": detail_cells[6].inner_text().strip(),
+                                                        "cumulative_total": detail_cells[7].inner_text().strip()
+                                                    }
+                                                    export.bid(company_name, bid_detail)
+                                                    add_bid(book, bid_detail)
+                                                    bids += 1
+                                        
+                                        i += 1
+                                
+                                print(f"  ✓ {company_name}: {bids} bids")
                         
-                        for company in ofs_data["companies"]:
-                            f.write(f'"{company["company_name"]}",')
-                            f.write(f'{company["ltp"]},{company["floor_price"]},{company["indicative_price"]},')
-                            f.write(f'{company["base_issue_size"]},{company["total_issue_size"]},')
-                            f.write(f'{company["cumulative_qty_100pc"]},{company["cumulative_qty_0pc"]},')
-                            f.write(f'{company["total_qty"]},{company["times_base"]},{company["times_total"]},')
-                            f.write(f'{company["nse_demand"]}\n')
-                
-                # Bid Details CSV
-                bid_csv_filename = f"{SAVE_DIR}/ofs_bid_details_{timestamp_file}.csv"
-                bid_csv_latest = f"{SAVE_DIR}/ofs_bid_details_latest.csv"
+                        i += 1
                 
-                for filename in [bid_csv_filename, bid_csv_latest]:
-                    with open(filename, "w", encoding="utf-8", newline='') as f:
-                        writer = csv.writer(f)
-                        writer.writerow([
-                            "Company", "Price Interval", "No. of Bids",
-                            "Qty Confirmed", "Qty Yet to Confirm", "Qty Total",
-                            "Cumulative Confirmed", "Cumulative Yet to Confirm", "Cumulative Total"
-                        ])
-                        
-                        for company in ofs_data["companies"]:
-                            for bid in company["bid_details"]:
-                                writer.writerow([
-                                    company["company_name"],
-                                    bid["price_interval"],
-                                    bid["no_of_bids"],
-                                    bid["qty_confirmed"],
-                                    bid["qty_yet_to_confirm"],
-                                    bid["qty_total"],
-                                    bid["cumulative_confirmed"],
-                                    bid["cumulative_yet_to_confirm"],
-                                    bid["cumulative_total"]
-                                ])
+                # Append each company's book to the store
+                scraped_ts = time.time()
+                for company_name, book in books.items():
+                    store.append(store_key(company_name, issue_ids, reserved), "nse", scraped_ts, book)
+                store.flush()
                 
                 print(f"\n✅ Files saved:")
-                print(f"   📄 {json_latest} (latest)")
-                print(f"   📊 {csv_latest} (latest)")
-                print(f"   📈 {bid_csv_latest} (latest)")
-                print(f"\n💼 Scraped {len(ofs_data['companies'])} companies")
-                page.wait_for_timeout(2000)
+                for path in export.paths:
+                    print(f"   📄 {path}")
+                print(f"\n💼 Scraped {export.companies} companies, {export.bids} bids")
+                time.sleep(REFRESH_INTERVAL)
             
         except Exception as e:
             print(f"\n❌ Error: {e}")
@@ -223,8 +168,8 @@ def scrape_nse_ofs():
             return False
             
         finally:
-            page.wait_for_timeout(2000)
-            context.close()
+            pool.close()
+            store.close()
 
 if __name__ == "__main__":
     scrape_nse_ofs()
\ No newline at end of file
@@ -0,0 +1,126 @@
+import os
+import time
+import hashlib
+import logging
+import httpx
+from browser_pool import NSE_OFS_URL
+
+logger = logging.getLogger("OFS")
+
+# The OFS endpoints are undocumented, so bid rows are located by key name
+# anywhere in the payload rather than by a fixed path. Confirmed qty is
+# preferred, matching the DOM extractors' column.
+NSE_API_PRICE_KEYS = ("price", "priceInterval", "bidPrice")
+NSE_API_QTY_KEYS = ("qtyConfirmed", "confirmedQty", "totalQty", "qtyTotal", "totalQuantity", "qty")
+NSE_API_NAME_KEYS = ("companyName", "company", "compName")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": NSE_OFS_URL,
+}
+
+
+class NSESessionExpired(Exception):
+    pass
+
+
+def to_number(val):
+    if isinstance(val, (int, float)):
+        return val
+    cleaned = str(val).replace(",", "").replace('"', "").strip()
+    return float(cleaned) if "." in cleaned else int(cleaned)
+
+
+def iter_bid_rows(payload):
+    """Yields (company, price, qty), taking the company from the nearest
+    enclosing object that carries a name."""
+    stack = [(payload, "")]
+    while stack:
+        node, company = stack.pop()
+        if isinstance(node, list):
+            stack.extend((v, company) for v in reversed(node))
+        elif isinstance(node, dict):
+            price_key = next((k for k in NSE_API_PRICE_KEYS if k in node), None)
+            qty_key = next((k for k in NSE_API_QTY_KEYS if k in node), None)
+            if price_key and qty_key:
+                yield company, node[price_key], node[qty_key]
+                continue
+
+            name_key = next((k for k in NSE_API_NAME_KEYS if k in node), None)
+            if name_key:
+                company = str(node[name_key]).strip()
+            stack.extend(
+                (v, company) for v in reversed(list(node.values()))
+                if isinstance(v, (list, dict))
+            )
+
+
+def parse_nse_payload(payload):
+    """Returns {company: (book, cutoff_qty)} like the DOM extractors."""
+    books = {}
+    cutoffs = {}
+
+    for company, raw_price, raw_qty in iter_bid_rows(payload):
+        book = books.setdefault(company, {})
+        try:
+            if str(raw_price).strip().lower().startswith("cut"):
+                cutoffs.setdefault(company, int(to_number(raw_qty)))
+                continue
+            book[float(to_number(raw_price))] = int(to_number(raw_qty))
+        except (TypeError, ValueError):
+            continue
+
+    return {company: (book, cutoffs.get(company)) for company, book in books.items()}
+
+
+def cookie_header(cookies):
+    return "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+
+class NSEApiClient:
+    """Polls NSE JSON endpoints over keep-alive connections using cookies
+    harvested from a browser session."""
+
+    def __init__(self, cookies=(), timeout=10, record_dir=None):
+        self.record_dir = record_dir
+        self.client = httpx.Client(
+            headers=DEFAULT_HEADERS,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=2, max_keepalive_connections=2),
+        )
+        self.set_cookies(cookies)
+        self.digests = {}
+
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+
+    def set_cookies(self, cookies):
+        self.client.headers["Cookie"] = cookie_header(cookies)
+
+    def record(self, body):
+        if not self.record_dir:
+            return
+        path = os.path.join(self.record_dir, f"{int(time.time() * 1000)}.json")
+        with open(path, "wb") as f:
+            f.write(body)
+
+    def fetch(self, url):
+        """Returns the decoded payload, or None if the body is identical to
+        the last one fetched from this url."""
+        resp = self.client.get(url)
+        if resp.status_code in (401, 403):
+            raise NSESessionExpired(resp.status_code)
+        resp.raise_for_status()
+
+        digest = hashlib.blake2b(resp.content, digest_size=16).digest()
+        if self.digests.get(url) == digest:
+            return None
+        self.digests[url] = digest
+
+        self.record(resp.content)
+        return resp.json()
+
+    def close(self):
+        self.client.close()
@@ -1,13 +1,20 @@
 import os
 import time
 import csv
+import queue
 import threading
-import requests
+import asyncio
 import pandas as pd
-from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
-from threading import Lock
+from dataclasses import dataclass, field, replace
 import logging
+from nse_api import NSEApiClient, NSESessionExpired, parse_nse_payload
+from bse_client import BSEClient, BSE_BASE_URL
+from bse_parsers import parse_bse_book, default_backend
+from issues import load_issues
+from browser_pool import BrowserPool, arm_refresh, wait_refreshed, is_api_url
+from scheduler import PollScheduler, error_details
+from metrics import FETCH_SECONDS, PARSE_SECONDS
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,166 +25,676 @@ logging.basicConfig(
 
 
 logger = logging.getLogger("OFS")
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# category -> (tab selector, refresh link selector, table selector,
+# page function the refresh link calls)
+NSE_CATEGORIES = {
+    "retail": (
+        "text=Retail Category",
+        "a[onclick=\"refreshApi('loadOfsRetail')\"]",
+        "#ofsRetailTable",
+        "loadOfsRetail",
+    ),
+    "general": (
+        "text=General Category",
+        "a[onclick=\"refreshApi('loadOfsGeneral')\"]",
+        "#ofsGeneralTable",
+        "loadOfsGeneral",
+    ),
+}
+
+# Walks every accordion row and its bid-detail table inside the page and
+# returns parallel arrays, so a whole book costs a single IPC round-trip.
+NSE_BULK_EXTRACT_JS = """
+(tableSelector) => {
+    const companies = [], company = [], price = [], qty = [], cutoff = [];
+    const rows = document.querySelectorAll(`${tableSelector} > tbody > tr`);
+
+    const toNumber = (text) => {
+        const cleaned = text.replace(/[,"\\s]/g, "");
+        return cleaned === "" ? NaN : Number(cleaned);
+    };
+
+    for (let i = 0; i < rows.length; i++) {
+        if (!rows[i].classList.contains("accordActive")) continue;
+        const nameCell = rows[i].children[1];
+        companies.push(nameCell ? nameCell.textContent.trim() : "");
+        const companyIdx = companies.length - 1;
+
+        const detail = rows[++i];
+        const body = detail && detail.querySelector("table tbody");
+        if (!body) continue;
+
+        for (const r of body.querySelectorAll("tr")) {
+            const c = r.querySelectorAll("td");
+            if (c.length < 3) continue;
+
+            const rawPrice = c[0].textContent.trim();
+            const q = toNumber(c[2].textContent);
+            if (!Number.isInteger(q)) continue;
+
+            const isCutoff = rawPrice.toLowerCase().startsWith("cut");
+            const p = isCutoff ? 0 : toNumber(rawPrice);
+            if (Number.isNaN(p)) continue;
+
+            company.push(companyIdx);
+            price.push(p);
+            qty.push(q);
+            cutoff.push(isCutoff);
+        }
+    }
+    return { companies, company, price, qty, cutoff };
+}
+"""
+
+# Cheap change check run before extraction: the "as on" timestamp plus an
+# FNV-1a hash of the table text, computed inside the page.
+NSE_FINGERPRINT_JS = """
+(tableSelector) => {
+    const table = document.querySelector(tableSelector);
+    const asOn = document.querySelector(".asondate");
+    const text = table ? table.textContent : "";
+
+    let h = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        h ^= text.charCodeAt(i);
+        h = Math.imul(h, 0x01000193);
+    }
+    return `${asOn ? asOn.textContent.trim() : ""}|${text.length}|${(h >>> 0).toString(16)}`;
+}
+"""
+
+
+@dataclass(frozen=True)
+class VenueSnapshot:
+    """One venue's book as last published. Never mutated, book included:
+    a new fetch produces a new snapshot, so a reader holding one always
+    sees a book, cutoff and timestamp that belong together."""
+    book: dict = field(default_factory=dict)
+    cutoff_qty: int | None = None
+    ts: float | None = None
+    version: int = 0
+
+    def updated(self, book, cutoff_qty, ts):
+        # the cut-off quantity is taken from the first fetch that has one
+        if self.cutoff_qty is not None:
+            cutoff_qty = self.cutoff_qty
+        return VenueSnapshot(book, cutoff_qty, ts, self.version + 1)
+
+    def refreshed(self, ts):
+        return replace(self, ts=ts)
+
+
+class IssueBook:
+    """Latest per-venue snapshots for one tracked issue.
+
+    Each venue has a single writer (its scraper thread or task), which
+    publishes by rebinding the attribute to a new VenueSnapshot. Rebinding
+    is atomic, so readers take the current snapshot without a lock or a
+    copy.
+    """
+
+    def __init__(self, issue):
+        self.issue = issue
+        self.nse = VenueSnapshot()
+        self.bse = VenueSnapshot()
+
 
 class OFSScraper:
-    def __init__(self):
-        self.nse_cutoff_qty = None
-        self.bse_cutoff_qty = None
+    def __init__(self, issues=None):
         self.nseRunning = True
         self.bseRunning = True
 
-        self.scrapTime = 10
-
-        self.nse_last_updated_ts = None
-        self.bse_last_updated_ts = None
+        # "bulk" pulls the whole table in one page.evaluate call,
+        # "dom" walks it cell by cell through element handles
+        self.nse_extract_mode = "bulk"
+
+        # "dom" scrapes the rendered table, "api" only uses the browser for
+        # session cookies and polls the JSON endpoint behind the refresh link
+        self.nse_fetch_mode = "dom"
+        self.nse_record_dir = None
+        self.nse_headless = True
+
+        # extracted NSE tables waiting to be parsed and published; a full
+        # queue holds the browser stage back
+        self.nse_pipeline_depth = 4
+
+        # BSE table parser: "bs4", "lxml", "slice" or "selectolax"
+        self.bse_parser = default_backend()
+        self.bse_max_concurrency = 4
+        self.bse_base_url = BSE_BASE_URL
+
+        # per-target poll intervals, backoff and per-host request budgets
+        self.scheduler = PollScheduler()
+        self.scheduler.add_host("nse", rate=0.5, burst=2)
+        self.scheduler.add_host("bse", rate=2, burst=4)
+
+        # callables (issue_id, ts) told about every published book; may be
+        # called from any scraper thread
+        self.listeners = []
+        # callables (issue_id, venue, ts) told when a fetch found a book
+        # unchanged and only its timestamp moved on
+        self.refresh_listeners = []
+
+        # optional store.BookStore every published book is appended to
+        self.store = None
+
+        # fetches whose fingerprint matches the previous one are skipped
+        # before parsing; NSE tables are fingerprinted here, BSE and NSE
+        # API bodies inside their clients
+        self.fingerprints = {}
+        self.cycle_stats = {
+            "nse": {"processed": 0, "skipped": 0},
+            "bse": {"processed": 0, "skipped": 0},
+        }
+
+        self.issues = {i.issue_id: i for i in (issues or load_issues())}
+        self.books = {issue_id: IssueBook(i) for issue_id, i in self.issues.items()}
+        for issue in self.issues.values():
+            self.scheduler.target(("nse", issue.nse_category))
+            self.scheduler.target(("bse", issue.issue_id))
 
 
-        self.nse_data = {}
-        self.bse_data = {} 
-        self.state_lock = Lock()
 
-
-        
     def parse_int(self, val):
         return int(val.replace(",", "").replace('"', "").strip())
 
 
+    def notify(self, issue_ids, ts):
+        for listener in self.listeners:
+            for issue_id in issue_ids:
+                listener(issue_id, ts)
+
+
+    def record_cycle(self, venue, processed):
+        self.cycle_stats[venue]["processed" if processed else "skipped"] += 1
+
+
+    def touch(self, venue, issue_ids, ts):
+        """Marks unchanged books as still current."""
+        for issue_id in issue_ids:
+            self.refresh(venue, issue_id, ts)
+
+
+    def refresh(self, venue, issue_id, ts):
+        state = self.books[issue_id]
+        setattr(state, venue, getattr(state, venue).refreshed(ts))
+        for listener in self.refresh_listeners:
+            listener(issue_id, venue, ts)
+
+
+    def apply_book(self, venue, issue_id, book, cutoff_qty, ts):
+        """Swaps in a new snapshot for one venue of an issue and persists it.
+        Returns False, refreshing only the timestamp, if the book is
+        unchanged. Listeners are not notified."""
+        state = self.books[issue_id]
+        current = getattr(state, venue)
+        if book == current.book and (cutoff_qty is None or current.cutoff_qty is not None):
+            self.refresh(venue, issue_id, ts)
+            return False
+
+        snapshot = current.updated(book, cutoff_qty, ts)
+        setattr(state, venue, snapshot)
+        if self.store is not None:
+            self.store.append(issue_id, venue, ts, book, snapshot.cutoff_qty)
+        return True
+
+
+    def issues_by_category(self):
+        grouped = {}
+        for issue in self.issues.values():
+            grouped.setdefault(issue.nse_category, []).append(issue)
+        return grouped
+
+
+
+    def extract_nse_bulk(self, page, table_selector):
+        return self.nse_books_from_raw(page.evaluate(NSE_BULK_EXTRACT_JS, table_selector))
+
+
+    def nse_books_from_raw(self, raw):
+        """Books from the parallel arrays NSE_BULK_EXTRACT_JS returns."""
+        names = raw["companies"]
+        books = {name: {} for name in names}
+        cutoffs = {}
+        for idx, price, qty, is_cutoff in zip(raw["company"], raw["price"], raw["qty"], raw["cutoff"]):
+            name = names[idx]
+            if is_cutoff:
+                cutoffs.setdefault(name, qty)
+                continue
+            books[name][float(price)] = qty
+        return {name: (book, cutoffs.get(name)) for name, book in books.items()}
+
+
+    def extract_nse_dom(self, page, table_selector):
+        results = {}
+
+        rows = page.query_selector_all(f"{table_selector} tbody tr")
+        i = 0
+
+        while i < len(rows):
+            row = rows[i]
+            if "accordActive" in (row.get_attribute("class") or ""):
+                cells = row.query_selector_all("td")
+                name = cells[1].inner_text().strip() if len(cells) > 1 else ""
+                book = {}
+                cutoff_qty = None
+
+                if i + 1 < len(rows):
+                    table = rows[i + 1].query_selector("table tbody")
+                    if table:
+                        for r in table.query_selector_all("tr"):
+                            try:
+                                c = r.query_selector_all("td")
+                                raw_price = c[0].inner_text().strip()
+                                if raw_price.lower().startswith("cut"):
+                                    if cutoff_qty is None:
+                                        cutoff_qty = self.parse_int(c[2].inner_text())
+                                    continue
+                                price = float(raw_price)
+                                qty = self.parse_int(c[2].inner_text())
+                                book[price] = qty
+                            except Exception:
+                                continue
+
+                results[name] = (book, cutoff_qty)
+                i += 2
+                continue
+            i += 1
+
+        return results
+
+
+    def publish_nse(self, issues, results):
+        """Fans one category's per-company books out to the issues tracked
+        in that category, matched by NSE company name."""
+        by_name = {name.strip().lower(): v for name, v in results.items()}
+        now = time.time()
+        published = []
+
+        for issue in issues:
+            found = by_name.get(issue.nse_name.strip().lower())
+            if found is None and len(issues) == 1 and len(results) == 1:
+                found = next(iter(results.values()))
+            if found is None:
+                continue
+
+            book, cutoff_qty = found
+            if self.apply_book("nse", issue.issue_id, book, cutoff_qty, now):
+                published.append(issue.issue_id)
+
+        self.notify(published, now)
+        return len(published)
+
+
+    def discover_nse_api(self, page, category):
+        tab, refresh, _, api = NSE_CATEGORIES[category]
+        page.click(tab, timeout=15000)
+
+        with page.expect_response(
+            lambda r: r.request.resource_type in ("xhr", "fetch") and is_api_url(r.url, api),
+            timeout=30000
+        ) as info:
+            page.click(refresh)
+
+        response = info.value
+        return response.url, response.json()
+
+
+    def discover_nse_endpoints(self, page, grouped):
+        """({category: url}, {category: first payload})"""
+        endpoints = {}
+        pending = {}
+        for category in grouped:
+            endpoints[category], pending[category] = self.discover_nse_api(page, category)
+            logger.info("NSE API discovered | category=%s | url=%s", category, endpoints[category])
+        return endpoints, pending
+
+
+    def poll_nse_api(self, context, page, grouped):
+        endpoints, pending = self.discover_nse_endpoints(page, grouped)
+        client = NSEApiClient(context.cookies(), record_dir=self.nse_record_dir)
+
+        def rediscover():
+            page.reload(wait_until="domcontentloaded", timeout=60000)
+            return (*self.discover_nse_endpoints(page, grouped), context.cookies())
+
+        try:
+            self.poll_nse_endpoints(client, grouped, endpoints, pending, rediscover)
+        finally:
+            client.close()
+
+
+    def poll_nse_endpoints(self, client, grouped, endpoints, pending, rediscover):
+        """Polls each category's JSON endpoint with `client`. When NSE
+        rejects the session, rediscover() is called for fresh
+        (endpoints, pending payloads, cookies); if that fails too the
+        category backs off and tries again when next due."""
+        keys = [("nse", category) for category in grouped]
+
+        while self.nseRunning:
+            for category, issues in grouped.items():
+                key = ("nse", category)
+                if self.scheduler.due_in(key) > 0:
+                    continue
+                cycle_start = time.time()
+
+                try:
+                    payload = pending.pop(category, None)
+                    if payload is None:
+                        time.sleep(self.scheduler.throttle("nse"))
+                        with FETCH_SECONDS.time("nse"):
+                            payload = client.fetch(endpoints[category])
+                    if payload is None:
+                        self.record_cycle("nse", False)
+                        self.touch("nse", [i.issue_id for i in issues], time.time())
+                        self.scheduler.record_success(key, False)
+                        logger.info("NSE cycle done | category=%s | unchanged | mode=api", category)
+                        continue
+                    self.record_cycle("nse", True)
+
+                    with PARSE_SECONDS.time("nse"):
+                        results = parse_nse_payload(payload)
+                    published = self.publish_nse(issues, results)
+                    self.scheduler.record_success(key, published > 0)
+
+                    logger.info(
+                        "NSE cycle done | category=%s | companies=%d | issues=%d | mode=api | time=%.3fs",
+                        category,
+                        len(results),
+                        published,
+                        time.time() - cycle_start
+                    )
+
+                except NSESessionExpired as e:
+                    delay = self.scheduler.record_error(key, *error_details(e))
+                    logger.warning("NSE session rejected (%s), harvesting cookies again | retry in %.1fs", e, delay)
+                    try:
+                        fresh_endpoints, fresh_pending, cookies = rediscover()
+                    except Exception:
+                        # keep the old session; the next rejection retries
+                        # with a longer backoff
+                        logger.exception("NSE session refresh failed | category=%s | retry in %.1fs", category, delay)
+                        continue
+                    endpoints.update(fresh_endpoints)
+                    pending.update(fresh_pending)
+                    client.set_cookies(cookies)
+
+                except Exception as e:
+                    delay = self.scheduler.record_error(key, *error_details(e))
+                    logger.exception("NSE API cycle failed | category=%s | retry in %.1fs", category, delay)
+
+            time.sleep(min(self.scheduler.next_due(keys), 1.0))
+
 
     def scrape_nse(self):
-        URL = "https://www.nseindia.com/market-data/ofs-information"
+        grouped = self.issues_by_category()
+        api = self.nse_fetch_mode == "api"
 
         with sync_playwright() as p:
-            context = p.chromium.launch_persistent_context(
-                user_data_dir="browser_profile",
-                headless=False,
-                args=["--disable-blink-features=AutomationControlled"]
+            # one page per category, all in one context
+            pool = BrowserPool(p, size=1 if api else len(grouped), headless=self.nse_headless)
+            start = time.time()
+
+            try:
+                pool.start()
+                if api:
+                    page = pool.acquire()
+                    logger.info("NSE browser ready | time=%.2fs", time.time() - start)
+                    self.poll_nse_api(pool.context, page, grouped)
+                    return
+
+                pages = {category: pool.acquire() for category in grouped}
+                logger.info("NSE browser ready | pages=%d | time=%.2fs", len(pages), time.time() - start)
+                self.run_nse_pipeline(pool, pages, grouped)
+
+            finally:
+                pool.close()
+
+
+    def run_nse_pipeline(self, pool, pages, grouped):
+        """Browser work (refresh, render, extract) stays on this thread, as
+        Playwright's sync API requires; turning extracted tables into books
+        and publishing them runs on a parse thread fed by a bounded queue,
+        so it overlaps the next refresh."""
+        extracted = queue.Queue(maxsize=self.nse_pipeline_depth)
+        parser = threading.Thread(
+            target=self.nse_parse_stage,
+            args=(extracted, grouped),
+            name="NSE-parse",
+            daemon=True
+        )
+        parser.start()
+
+        try:
+            self.nse_fetch_stage(pool, pages, grouped, extracted)
+        finally:
+            extracted.put(None)
+            parser.join()
+
+
+    def nse_fetch_stage(self, pool, pages, grouped, extracted):
+        open_tabs = set()
+        keys = [("nse", category) for category in grouped]
+
+        while self.nseRunning:
+            due = [c for c in grouped if self.scheduler.due_in(("nse", c)) <= 0]
+
+            # click every due refresh first so NSE serves them concurrently
+            refreshed = {}
+            for category in due:
+                try:
+                    refreshed[category] = self.refresh_nse_page(pages[category], category, open_tabs)
+                except Exception as e:
+                    pages[category] = self.recover_nse_page(pool, pages[category], category, e, open_tabs)
+
+            for category, cycle_start in refreshed.items():
+                try:
+                    self.collect_nse_page(pages[category], category, grouped[category], cycle_start, extracted)
+                except Exception as e:
+                    pages[category] = self.recover_nse_page(pool, pages[category], category, e, open_tabs)
+
+            time.sleep(min(self.scheduler.next_due(keys), 1.0))
+
+
+    def refresh_nse_page(self, page, category, open_tabs):
+        tab, refresh, table, api = NSE_CATEGORIES[category]
+        if category not in open_tabs:
+            page.click(tab, timeout=15000)
+            open_tabs.add(category)
+
+        time.sleep(self.scheduler.throttle("nse"))
+        arm_refresh(page, table, api)
+        cycle_start = time.time()
+        page.click(refresh)
+        return cycle_start
+
+
+    def collect_nse_page(self, page, category, issues, cycle_start, extracted):
+        key = ("nse", category)
+        table = NSE_CATEGORIES[category][2]
+
+        wait_refreshed(page)
+        page.wait_for_selector(f"{table} tbody tr", timeout=30000)
+        FETCH_SECONDS.observe(time.time() - cycle_start, "nse")
+
+        fingerprint = page.evaluate(NSE_FINGERPRINT_JS, table)
+        if self.fingerprints.get(category) == fingerprint:
+            self.record_cycle("nse", False)
+            self.touch("nse", [i.issue_id for i in issues], time.time())
+            self.scheduler.record_success(key, False)
+            logger.info(
+                "NSE cycle done | category=%s | unchanged | time=%.2fs",
+                category,
+                time.time() - cycle_start
             )
+            return
 
-            page = context.new_page()
+        extract_start = time.time()
+        if self.nse_extract_mode == "bulk":
+            payload = page.evaluate(NSE_BULK_EXTRACT_JS, table)
+        else:
+            payload = self.extract_nse_dom(page, table)
+        extract_elapsed = time.time() - extract_start
 
-            try:
-                page.goto("https://www.nseindia.com", wait_until="domcontentloaded", timeout=60000)
-                page.goto(URL, wait_until="domcontentloaded", timeout=60000)
-                page.click("text=Retail Category", timeout=15000)
+        # not due again until the parse stage has recorded the outcome
+        self.scheduler.hold(key)
+        extracted.put((category, payload, fingerprint, cycle_start, extract_elapsed))
 
-                while self.nseRunning:
-                    cycle_start = time.time()
-                    temp_data = {}
 
-                    logger.info("NSE cycle started")
+    def recover_nse_page(self, pool, page, category, exc, open_tabs):
+        """Call from an except block; returns the page to use next."""
+        delay = self.scheduler.record_error(("nse", category), *error_details(exc))
+        logger.exception("NSE cycle failed | category=%s | retry in %.1fs", category, delay)
+        if pool.is_healthy(page):
+            return page
 
-                    try:
-                        page.click("a[onclick=\"refreshApi('loadOfsRetail')\"]")
-                        page.wait_for_timeout(1000)
-
-                        page.wait_for_selector("#ofsRetailTable tbody tr", timeout=30000)
-
-                        with self.state_lock:
-                            self.nse_last_updated_ts = time.time()
-
-                        rows = page.query_selector_all("#ofsRetailTable tbody tr")
-                        i = 0
-
-                        while i < len(rows):
-                            row = rows[i]
-                            if "accordActive" in (row.get_attribute("class") or ""):
-                                if i + 1 < len(rows):
-                                    table = rows[i + 1].query_selector("table tbody")
-                                    if table:
-                                        for r in table.query_selector_all("tr"):
-                                            try:
-                                                c = r.query_selector_all("td")
-                                                raw_price = c[0].inner_text().strip()
-                                                if raw_price.lower().startswith("cut"):
-                                                    if self.nse_cutoff_qty is None:
-                                                        with self.state_lock:
-                                                            self.nse_cutoff_qty = self.parse_int(c[2].inner_text())
-                                                    continue
-                                                price = float(c[0].inner_text().strip())
-                                                qty = self.parse_int(c[2].inner_text())
-                                                temp_data[price] = qty
-                                            except:
-                                                continue
-                                i += 2
-                                continue
-                            i += 1
+        logger.warning("NSE page unusable, recycling it | category=%s", category)
+        open_tabs.discard(category)
+        try:
+            return pool.recycle(page)
+        except Exception as e:
+            # NSE or the network is down: keep the dead handle, the next
+            # due cycle fails on it and tries to recycle again
+            delay = self.scheduler.record_error(("nse", category), *error_details(e))
+            logger.exception("NSE page recycle failed | category=%s | retry in %.1fs", category, delay)
+            return page
+
+
+    def nse_parse_stage(self, extracted, grouped):
+        while True:
+            item = extracted.get()
+            if item is None:
+                return
+
+            category, payload, fingerprint, cycle_start, extract_elapsed = item
+            key = ("nse", category)
+            try:
+                parse_start = time.time()
+                results = self.nse_books_from_raw(payload) if self.nse_extract_mode == "bulk" else payload
+                PARSE_SECONDS.observe(extract_elapsed + time.time() - parse_start, "nse")
 
-                        with self.state_lock:
-                            self.nse_data = temp_data
+                published = self.publish_nse(grouped[category], results)
+                self.fingerprints[category] = fingerprint
+                self.record_cycle("nse", True)
+                self.scheduler.record_success(key, published > 0)
 
-                        elapsed = time.time() - cycle_start
-                        logger.info(
-                            "NSE cycle done | rows=%d | time=%.2fs",
-                            len(temp_data),
-                            elapsed
-                        )
+                logger.info(
+                    "NSE cycle done | category=%s | companies=%d | issues=%d | rows=%d | mode=%s | extract=%.3fs | time=%.2fs",
+                    category,
+                    len(results),
+                    published,
+                    sum(len(book) for book, _ in results.values()),
+                    self.nse_extract_mode,
+                    extract_elapsed,
+                    time.time() - cycle_start
+                )
 
-                    except Exception as e:
-                        logger.exception("NSE cycle failed")
+            except Exception as e:
+                delay = self.scheduler.record_error(key, *error_details(e))
+                logger.exception("NSE parse failed | category=%s | retry in %.1fs", category, delay)
 
-                    time.sleep(max(0, self.scrapTime - (time.time() - cycle_start)))
 
-            finally:
-                context.close()
+    def parse_bse(self, html):
+        return parse_bse_book(html, self.bse_parser)
 
 
-    def scrape_bse(self, scripcode="500188"):
-        url = f"https://www.bseindia.com/markets/PublicIssues/BSEBidDetails_ofs.aspx?flag=R&Scripcode={scripcode}"
+    def publish_bse(self, issue, book, cutoff_qty):
+        """Returns False, without publishing, if the book is unchanged."""
+        now = time.time()
+        if not self.apply_book("bse", issue.issue_id, book, cutoff_qty, now):
+            return False
 
-        headers = {"User-Agent": "Mozilla/5.0"}
+        self.notify([issue.issue_id], now)
+        return True
 
-        while self.bseRunning:
-            cycle_start = time.time()
-            temp_state = {}
 
-            logger.info("BSE cycle started")
+    async def scrape_bse_issue(self, client, semaphore, issue):
+        key = ("bse", issue.issue_id)
 
+        async with semaphore:
+            await asyncio.sleep(self.scheduler.throttle("bse"))
+            start = time.time()
             try:
-                response = requests.get(url, headers=headers, timeout=30)
+                with FETCH_SECONDS.time("bse"):
+                    html = await client.fetch(issue.scripcode, issue.bse_flag)
+            except Exception as e:
+                delay = self.scheduler.record_error(key, *error_details(e))
+                logger.exception("BSE fetch failed | issue=%s | retry in %.1fs", issue.issue_id, delay)
+                return
 
-                with self.state_lock:
-                    self.bse_last_updated_ts = time.time()
+        try:
+            await self.process_bse_page(client, issue, html, start)
+        except Exception as e:
+            # without an outcome the target would stay due and spin
+            client.forget(issue.scripcode, issue.bse_flag)
+            delay = self.scheduler.record_error(key, *error_details(e))
+            logger.exception("BSE cycle failed | issue=%s | retry in %.1fs", issue.issue_id, delay)
+
+
+    async def process_bse_page(self, client, issue, html, start):
+        key = ("bse", issue.issue_id)
+
+        if html is None:
+            self.record_cycle("bse", False)
+            self.touch("bse", [issue.issue_id], time.time())
+            self.scheduler.record_success(key, False)
+            logger.info("BSE cycle done | issue=%s | not modified | time=%.3fs", issue.issue_id, time.time() - start)
+            return
+
+        self.record_cycle("bse", True)
+        # parsing and the store append are synchronous; keep them off the
+        # event loop, which may also be serving the WebSocket clients
+        with PARSE_SECONDS.time("bse"):
+            parsed = await asyncio.to_thread(self.parse_bse, html)
+        if parsed is None:
+            client.forget(issue.scripcode, issue.bse_flag)
+            delay = self.scheduler.record_error(key)
+            logger.warning("BSE table not found | issue=%s | retry in %.1fs", issue.issue_id, delay)
+            return
+
+        temp_state, cutoff_qty = parsed
+        changed = await asyncio.to_thread(self.publish_bse, issue, temp_state, cutoff_qty)
+        self.scheduler.record_success(key, changed)
+        logger.info(
+            "BSE cycle done | issue=%s | rows=%d | changed=%s | time=%.3fs",
+            issue.issue_id,
+            len(temp_state),
+            changed,
+            time.time() - start
+        )
+
+
+    async def scrape_bse_async(self, client):
+        semaphore = asyncio.Semaphore(self.bse_max_concurrency)
+        keys = [("bse", issue_id) for issue_id in self.issues]
 
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, "html.parser")
+        while self.bseRunning:
+            due = [i for i in self.issues.values() if self.scheduler.due_in(("bse", i.issue_id)) <= 0]
 
-                table = soup.find("table", {"cellpadding": "4", "cellspacing": "1"})
-                if not table:
-                    logger.warning("BSE table not found")
-                    time.sleep(60)
-                    continue
+            results = await asyncio.gather(*(
+                self.scrape_bse_issue(client, semaphore, issue)
+                for issue in due
+            ), return_exceptions=True)
 
-                for row in table.find_all("tr"):
-                    try:
-                        cells = row.find_all("td")
-
-                        raw_price = cells[0].get_text(strip=True)
-                        if raw_price.lower().startswith("cut"):
-                            if self.bse_cutoff_qty is None:
-                                with self.state_lock:
-                                    self.bse_cutoff_qty = self.parse_int(cells[2].get_text())
-                            continue
-                        price = float(raw_price)
-                        qty = self.parse_int(cells[2].get_text())
-                        temp_state[price] = qty
-                    except:
-                        continue
+            for issue, result in zip(due, results):
+                if isinstance(result, Exception):
+                    logger.error("BSE cycle failed | issue=%s", issue.issue_id, exc_info=result)
 
-                with self.state_lock:
-                    self.bse_data = temp_state
-                     
+            await asyncio.sleep(min(self.scheduler.next_due(keys), 1.0))
 
-                elapsed = time.time() - cycle_start
-                logger.info(
-                    "BSE cycle done | rows=%d | time=%.2fs",
-                    len(temp_state),
-                    elapsed
-                )
 
-            except Exception:
-                logger.exception("BSE cycle failed")
+    async def run_bse_standalone(self):
+        client = BSEClient(self.bse_base_url, max_connections=self.bse_max_concurrency)
+        try:
+            await self.scrape_bse_async(client)
+        finally:
+            await client.aclose()
+
 
-            time.sleep(max(0, self.scrapTime - (time.time() - cycle_start)))
+    def scrape_bse(self):
+        asyncio.run(self.run_bse_standalone())
 
 
     def run_both(self):
@@ -194,4 +711,4 @@ class OFSScraper:
 
 
 if __name__ == "__main__":
-    OFSScraper().run_both()
\ No newline at end of file
+    OFSScraper().run_both()
@@ -1,6 +1,47 @@
 "use client"
 import { useEffect, useRef, useState } from "react"
 
+// packed frames (protocol.py): 28-byte little-endian header, issue id and
+// meta JSON padded to 8 bytes, then float64/int64 columns
+const PACKED_HEADER_SIZE = 28
+const textDecoder = new TextDecoder()
+
+function decodePacked(buffer) {
+  const view = new DataView(buffer)
+  const frameType = view.getUint8(5)
+  const issueLength = view.getUint16(6, true)
+  const seq = Number(view.getBigUint64(8, true))
+  const n = view.getUint32(16, true)
+  const m = view.getUint32(20, true)
+  const metaLength = view.getUint32(24, true)
+
+  let offset = PACKED_HEADER_SIZE
+  const issueId = textDecoder.decode(new Uint8Array(buffer, offset, issueLength))
+  offset += issueLength
+  const meta = JSON.parse(textDecoder.decode(new Uint8Array(buffer, offset, metaLength)))
+  offset += metaLength
+  offset += (8 - (offset % 8)) % 8
+
+  const prices = new Float64Array(buffer, offset, n)
+  const qty = new BigInt64Array(buffer, offset + 8 * n, n)
+  const msg = { v: view.getUint8(4), issue_id: issueId, seq, meta }
+
+  if (frameType === 0) {
+    const cumulative = new BigInt64Array(buffer, offset + 16 * n, n)
+    msg.type = "snapshot"
+    msg.data = Array.from(prices, (price, i) => ({
+      price,
+      qty: Number(qty[i]),
+      cumulative_qty: Number(cumulative[i]),
+    }))
+  } else {
+    msg.type = "delta"
+    msg.changed = Array.from(prices, (price, i) => [price, Number(qty[i])])
+    msg.removed = Array.from(new Float64Array(buffer, offset + 16 * n, m))
+  }
+  return msg
+}
+
 export default function Home() {
   const [data, setData] = useState([])
   const [meta, setMeta] = useState({})
@@ -10,7 +51,8 @@ export default function Home() {
   const [expanded, setExpanded] = useState(false)
 
   const socketRef = useRef(null)
-  const prevHashRef = useRef(null)
+  const levelsRef = useRef(new Map())
+  const seqRef = useRef(null)
   const reconnectTimeoutRef = useRef(null)
 
   const formatTime = (ts) => {
@@ -18,25 +60,59 @@ export default function Home() {
     return new Date(ts * 1000).toLocaleString()
   }
 
+  const applyFrame = (ws, msg) => {
+    const levels = levelsRef.current
+
+    if (msg.type === "snapshot") {
+      levels.clear()
+      for (const row of msg.data) levels.set(row.price, row.qty)
+      seqRef.current = msg.seq
+      return msg.data
+    }
+
+    if (msg.type !== "delta") return null
+
+    // a missed delta leaves the local book wrong; ask for a fresh snapshot
+    if (seqRef.current === null || msg.seq !== seqRef.current + 1) {
+      if (seqRef.current !== null) ws.send(JSON.stringify({ type: "resync" }))
+      seqRef.current = null
+      return null
+    }
+
+    for (const [price, qty] of msg.changed) levels.set(price, qty)
+    for (const price of msg.removed) levels.delete(price)
+    seqRef.current = msg.seq
+
+    // trimmed subscriptions start below demand the client does not hold
+    let cumulative = msg.meta?.cumulative_base || 0
+    return [...levels.keys()]
+      .sort((a, b) => b - a)
+      .map((price) => {
+        const qty = levels.get(price)
+        cumulative += qty
+        return { price, qty, cumulative_qty: cumulative }
+      })
+  }
+
   const connect = () => {
     setStatus("connecting")
     setError(null)
 
-    const ws = new WebSocket("ws://127.0.0.1:8000/ws/nse")
+    const ws = new WebSocket("ws://127.0.0.1:8000/ws/nse?encoding=packed")
+    ws.binaryType = "arraybuffer"
     socketRef.current = ws
+    seqRef.current = null
 
     ws.onopen = () => setStatus("connected")
 
     ws.onmessage = (event) => {
       try {
-        const msg = JSON.parse(event.data)
-        if (!msg?.data) return
+        const msg = typeof event.data === "string" ? JSON.parse(event.data) : decodePacked(event.data)
 
-        const hash = JSON.stringify(msg.data)
-        if (hash === prevHashRef.current) return
-        prevHashRef.current = hash
+        const rows = applyFrame(ws, msg)
+        if (!rows) return
 
-        setData(msg.data)
+        setData(rows)
         setMeta(msg.meta || {})
         setMessageCount((c) => c + 1)
       } catch (err) {
@@ -0,0 +1,158 @@
+from bisect import bisect_left
+
+# an update touching at least this many levels, and a quarter of the book,
+# rebuilds the arrays with one sort instead of inserting level by level
+REBUILD_MIN = 64
+
+
+class OrderBook:
+    """Merged demand curve of one issue across venues.
+
+    Price levels are kept sorted high to low in parallel arrays with a
+    cached running total. A venue update only touches the levels whose
+    quantity changed, and the running total is recomputed lazily from the
+    highest changed level downwards, so the cutoff is a binary search over
+    the cached sums instead of a full re-sort and re-sum.
+    """
+
+    def __init__(self, issue_size):
+        self.issue_size = issue_size
+        self.venues = {}
+
+        # parallel arrays, index 0 is the highest price; keys holds the
+        # negated prices so bisect works on an ascending list
+        self.keys = []
+        self.prices = []
+        self.qty = []
+        self.cumulative = []
+        self.valid = 0
+
+        self.refs = {}
+        self.version = 0
+        self.changed = set()
+
+    def __len__(self):
+        return len(self.prices)
+
+    def index(self, price):
+        i = bisect_left(self.keys, -price)
+        if i < len(self.keys) and self.keys[i] == -price:
+            return i, True
+        return i, False
+
+    def add(self, price, delta, ref):
+        i, found = self.index(price)
+        if not found:
+            self.keys.insert(i, -price)
+            self.prices.insert(i, price)
+            self.qty.insert(i, delta)
+            self.cumulative.insert(i, 0)
+        else:
+            self.qty[i] += delta
+
+        self.refs[price] = self.refs.get(price, 0) + ref
+        if self.refs[price] == 0:
+            del self.refs[price]
+            del self.keys[i], self.prices[i], self.qty[i], self.cumulative[i]
+
+        self.valid = min(self.valid, i)
+
+    def set_level(self, venue, price, qty):
+        levels = self.venues.setdefault(venue, {})
+        old = levels.get(price)
+        if old == qty:
+            return False
+
+        if qty is None:
+            del levels[price]
+            self.add(price, -old, -1)
+        elif old is None:
+            levels[price] = qty
+            self.add(price, qty, 1)
+        else:
+            levels[price] = qty
+            self.add(price, qty - old, 0)
+
+        self.version += 1
+        self.changed.add(price)
+        return True
+
+    def update_venue(self, venue, levels):
+        """Replaces a venue's levels, applying only the differences.
+        Returns the number of changed levels."""
+        old = self.venues.get(venue, {})
+        removed = [p for p in old if p not in levels]
+        updated = [p for p, qty in levels.items() if old.get(p) != qty]
+        changed = len(removed) + len(updated)
+
+        if changed >= REBUILD_MIN and changed * 4 >= len(self.prices):
+            # a first load or a reshuffle; inserts would be O(n^2)
+            self.venues[venue] = dict(levels)
+            self.rebuild()
+            self.version += changed
+            self.changed.update(removed, updated)
+            return changed
+
+        for price in removed:
+            self.set_level(venue, price, None)
+        for price in updated:
+            self.set_level(venue, price, levels[price])
+
+        return changed
+
+    def rebuild(self):
+        """Recomputes the merged arrays from every venue's levels."""
+        qty = {}
+        refs = {}
+        for levels in self.venues.values():
+            for price, q in levels.items():
+                qty[price] = qty.get(price, 0) + q
+                refs[price] = refs.get(price, 0) + 1
+
+        self.prices = sorted(qty, reverse=True)
+        self.keys = [-p for p in self.prices]
+        self.qty = [qty[p] for p in self.prices]
+        self.cumulative = [0] * len(self.prices)
+        self.refs = refs
+        self.valid = 0
+
+    def level_qty(self, price):
+        i, found = self.index(price)
+        return self.qty[i] if found else None
+
+    def drain_changes(self):
+        """Prices touched since the last call."""
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def ensure_cumulative(self):
+        running = self.cumulative[self.valid - 1] if self.valid else 0
+        for i in range(self.valid, len(self.qty)):
+            running += self.qty[i]
+            self.cumulative[i] = running
+        self.valid = len(self.qty)
+
+    def cutoff_price(self):
+        self.ensure_cumulative()
+        i = bisect_left(self.cumulative, self.issue_size)
+        return self.prices[i] if i < len(self.prices) else None
+
+    def total_demand(self):
+        self.ensure_cumulative()
+        return self.cumulative[-1] if self.cumulative else 0
+
+    def top_price(self):
+        return self.prices[0] if self.prices else None
+
+    def columns(self):
+        """(prices, qty, cumulative), high to low."""
+        self.ensure_cumulative()
+        return self.prices, self.qty, self.cumulative
+
+    def levels(self):
+        """Same rows as server.cumulative_high_to_low."""
+        self.ensure_cumulative()
+        return [
+            {"price": p, "qty": q, "cumulative_qty": c}
+            for p, q, c in zip(self.prices, self.qty, self.cumulative)
+        ]
@@ -0,0 +1,217 @@
+"""
+WebSocket protocol v2: one snapshot per connection (or resync) followed by
+sequence-numbered deltas.
+
+    {"v": 2, "type": "snapshot", "issue_id", "seq", "data": [{price, qty, cumulative_qty}], "meta"}
+    {"v": 2, "type": "delta", "issue_id", "seq", "changed": [[price, qty]], "removed": [price], "meta"}
+
+Deltas carry per-level quantities only; clients recompute the running
+cumulative. A client that sees seq jump by more than one sends
+{"type": "resync"} and gets a fresh snapshot.
+
+Frames come in one of several encodings, picked per connection; JSON
+frames are sent as text WebSocket messages, the others as binary:
+
+    json     the messages above (default)
+    msgpack  the same messages in MessagePack, if msgpack is installed
+    packed   columnar binary; a PACKED_HEADER, then the issue id and the
+             meta as UTF-8 JSON, zero-padded to a multiple of 8 bytes, then
+             little-endian columns:
+                 snapshot: price float64[n], qty int64[n], cumulative int64[n]
+                 delta:    price float64[n], qty int64[n], removed float64[m]
+"""
+import sys
+import json
+import struct
+from array import array
+from metrics import FRAME_BYTES
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PROTOCOL_VERSION = 2
+
+# magic, version, frame type, issue id length, seq, n, m, meta length
+PACKED_HEADER = struct.Struct("<4sBBHQIII")
+PACKED_MAGIC = b"OFSP"
+PACKED_TYPES = {"snapshot": 0, "delta": 1}
+
+# array() uses native byte order; packed frames are little-endian
+SWAP = sys.byteorder != "little"
+
+DEFAULT_ENCODING = "json"
+ENCODINGS = ("json", "packed") + (("msgpack",) if msgpack is not None else ())
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+def pack_column(values, typecode):
+    if hasattr(values, "astype"):
+        # numpy columns from curve.VectorBook
+        return values.astype("<f8" if typecode == "d" else "<i8").tobytes()
+    column = array(typecode, values)
+    if SWAP:
+        column.byteswap()
+    return column.tobytes()
+
+
+def unpack_column(buf, offset, n, typecode):
+    column = array(typecode, buf[offset:offset + 8 * n])
+    if SWAP:
+        column.byteswap()
+    return column.tolist()
+
+
+def encode_packed(frame_type, issue_id, seq, meta, columns, removed=()):
+    issue = issue_id.encode()
+    meta = encode(meta)
+    n = len(columns[0])
+    head = PACKED_HEADER.pack(
+        PACKED_MAGIC, PROTOCOL_VERSION, PACKED_TYPES[frame_type], len(issue), seq, n, len(removed), len(meta)
+    )
+    padding = -(len(head) + len(issue) + len(meta)) % 8
+    parts = [head, issue, meta, b"\0" * padding]
+    for values, typecode in zip(columns, "dqq"):
+        parts.append(pack_column(values, typecode))
+    if frame_type == "delta":
+        parts.append(pack_column(removed, "d"))
+    return b"".join(parts)
+
+
+def decode_packed(frame):
+    """The message a packed frame carries, in the same shape as JSON."""
+    magic, version, frame_type, issue_len, seq, n, m, meta_len = PACKED_HEADER.unpack_from(frame, 0)
+    if magic != PACKED_MAGIC:
+        raise ValueError("Not a packed frame")
+
+    offset = PACKED_HEADER.size
+    issue_id = frame[offset:offset + issue_len].decode()
+    offset += issue_len
+    meta = json.loads(frame[offset:offset + meta_len])
+    offset += meta_len
+    offset += -offset % 8
+
+    prices = unpack_column(frame, offset, n, "d")
+    qty = unpack_column(frame, offset + 8 * n, n, "q")
+    message = {"v": version, "issue_id": issue_id, "seq": seq, "meta": meta}
+
+    if frame_type == PACKED_TYPES["snapshot"]:
+        cumulative = unpack_column(frame, offset + 16 * n, n, "q")
+        message["type"] = "snapshot"
+        message["data"] = [
+            {"price": p, "qty": q, "cumulative_qty": c}
+            for p, q, c in zip(prices, qty, cumulative)
+        ]
+    else:
+        message["type"] = "delta"
+        message["changed"] = [[p, q] for p, q in zip(prices, qty)]
+        message["removed"] = unpack_column(frame, offset + 16 * n, m, "d")
+    return message
+
+
+def decode(frame, encoding=DEFAULT_ENCODING):
+    if encoding == "packed":
+        return decode_packed(frame)
+    if encoding == "msgpack":
+        return msgpack.unpackb(frame)
+    return json.loads(frame)
+
+
+def serialize(message, encoding):
+    if encoding == "msgpack":
+        return msgpack.packb(message)
+    return encode(message)
+
+
+class BookStream:
+    """Turns successive versions of one issue's OrderBook into encoded
+    frames. Each frame is encoded at most once per encoding and shared by
+    every client using that encoding."""
+
+    def __init__(self, issue_id):
+        self.issue_id = issue_id
+        self.seq = 0
+        self.book_version = None
+        self.meta = None
+        self.changed = None
+        self.removed = None
+        self.deltas = {}
+        self.snapshots = {}
+
+    def publish(self, book, meta, encoding=DEFAULT_ENCODING):
+        """Returns the delta frame for the book's changes since the last
+        publish, or None if the book has not changed."""
+        if not self.advance(book, meta):
+            return None
+        return self.delta_frame(encoding)
+
+    def advance(self, book, meta):
+        """Records the book's changes as the next delta without encoding
+        it; frames are encoded on demand by delta_frame(). Returns False
+        if the book has not changed."""
+        if book.version == self.book_version:
+            return False
+
+        changed = []
+        removed = []
+        for price in sorted(book.drain_changes(), reverse=True):
+            qty = book.level_qty(price)
+            if qty is None:
+                removed.append(price)
+            else:
+                changed.append([price, qty])
+
+        self.seq += 1
+        self.book_version = book.version
+        self.meta = meta
+        self.changed = changed
+        self.removed = removed
+        self.deltas = {}
+        self.snapshots = {}
+        return True
+
+    def delta_frame(self, encoding=DEFAULT_ENCODING):
+        """The last published delta in `encoding`."""
+        frame = self.deltas.get(encoding)
+        if frame is None:
+            if encoding == "packed":
+                prices = [price for price, _ in self.changed]
+                qty = [q for _, q in self.changed]
+                frame = encode_packed("delta", self.issue_id, self.seq, self.meta, (prices, qty), self.removed)
+            else:
+                frame = serialize({
+                    "v": PROTOCOL_VERSION,
+                    "type": "delta",
+                    "issue_id": self.issue_id,
+                    "seq": self.seq,
+                    "changed": self.changed,
+                    "removed": self.removed,
+                    "meta": self.meta,
+                }, encoding)
+            self.deltas[encoding] = frame
+            FRAME_BYTES.observe(len(frame), "delta", encoding)
+        return frame
+
+    def snapshot_frame(self, book, encoding=DEFAULT_ENCODING):
+        """Full book at the current seq, encoded at most once per seq.
+        Must be called before the book is changed again."""
+        frame = self.snapshots.get(encoding)
+        if frame is None:
+            if encoding == "packed":
+                frame = encode_packed("snapshot", self.issue_id, self.seq, self.meta, book.columns())
+            else:
+                frame = serialize({
+                    "v": PROTOCOL_VERSION,
+                    "type": "snapshot",
+                    "issue_id": self.issue_id,
+                    "seq": self.seq,
+                    "data": book.levels(),
+                    "meta": self.meta,
+                }, encoding)
+            self.snapshots[encoding] = frame
+            FRAME_BYTES.observe(len(frame), "snapshot", encoding)
+        return frame
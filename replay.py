@@ -0,0 +1,179 @@
+"""
+Offline stand-in for OFSScraper that re-publishes recorded books.
+
+Sources:
+  - a BookStore directory (data/store), replayed per issue and venue
+  - a directory of scraper outputs: nse.py's NDJSON exports and
+    archive/ofs_<day>.ndjson.gz files, older ofs_data_*.json dumps and
+    two-column "Price Interval,Qty Confirmed" CSVs under nse/ or bse/
+    (e.g. data/nse/nse_latest.csv, data/bse/HINDZINC_latest.csv).
+    ofs_data_latest.ndjson is skipped when archives are present, as its
+    scrape is archived too; NDJSON files are streamed scrape by scrape.
+
+speed=1 replays at the recorded pace, speed=N N times faster and speed=0
+as fast as the broadcaster can take it.
+
+    OFS_SOURCE=replay OFS_REPLAY_PATH=data/store OFS_REPLAY_SPEED=20 uvicorn server:app
+"""
+import os
+import csv
+import json
+import time
+import heapq
+import asyncio
+import logging
+from datetime import datetime
+from nsebse import OFSScraper
+from store import BookStore, VENUES
+from export import read_scrapes, bid_book, NDJSON_LATEST, SUMMARY_LATEST, BID_LATEST, ARCHIVE_SUFFIX
+
+logger = logging.getLogger("OFS")
+
+
+def is_store(path):
+    """A store root holds one directory of .idx/.seg segments per issue."""
+    for entry in os.scandir(path):
+        if entry.is_dir() and any(n.endswith(".idx") for n in os.listdir(entry.path)):
+            return True
+    return False
+
+
+def read_book_csv(path):
+    book = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                price = float(row["Price Interval"].replace(",", ""))
+                qty = int(row["Qty Confirmed"].replace(",", ""))
+            except (KeyError, ValueError):
+                continue
+            book[price] = book.get(price, 0) + qty
+    return book
+
+
+class ReplayScraper(OFSScraper):
+    def __init__(self, source, speed=1.0, loop=False, issues=None):
+        super().__init__(issues)
+        self.source = source
+        self.speed = speed
+        self.loop = loop
+
+        self.replayed = 0
+        self.finished = False
+
+    def events_from_store(self):
+        store = BookStore(self.source)
+        streams = [
+            ((ts, issue_id, venue, book, cutoff_qty) for ts, venue, book, cutoff_qty in store.read(issue_id))
+            for issue_id in self.issues
+        ]
+        return heapq.merge(*streams, key=lambda e: e[0])
+
+    def events_from_files(self):
+        by_name = {i.nse_name.strip().lower(): i.issue_id for i in self.issues.values()}
+        default_id = next(iter(self.issues)) if len(self.issues) == 1 else None
+
+        paths = [(root, name) for root, _, files in os.walk(self.source) for name in files]
+        archived = any(name.endswith(ARCHIVE_SUFFIX) for _, name in paths)
+        events = []
+        streams = []
+
+        for root, name in paths:
+            venue = os.path.basename(root)
+            path = os.path.join(root, name)
+
+            if name.endswith(".json"):
+                with open(path, encoding="utf-8") as f:
+                    dump = json.load(f)
+                if "companies" not in dump:
+                    continue
+                ts = datetime.strptime(dump["scraped_at"], "%Y-%m-%d %H:%M:%S").timestamp()
+                for company in dump["companies"]:
+                    issue_id = by_name.get(company["company_name"].strip().lower(), default_id)
+                    if issue_id is not None:
+                        events.append((ts, issue_id, "nse", bid_book(company), None))
+
+            elif name.endswith((".ndjson", ARCHIVE_SUFFIX)):
+                if name == NDJSON_LATEST and archived:
+                    continue
+                streams.append(self.scrape_events(path, by_name, default_id))
+
+            elif name in (SUMMARY_LATEST, BID_LATEST):
+                # per-company rows; the NDJSON export carries the same data
+                continue
+
+            elif name.endswith(".csv") and venue in VENUES:
+                prefix = name.rsplit("_", 1)[0]
+                issue_id = prefix if prefix in self.issues else default_id
+                book = read_book_csv(path)
+                if issue_id is not None and book:
+                    events.append((os.path.getmtime(path), issue_id, venue, book, None))
+
+        events.sort(key=lambda e: e[0])
+        return heapq.merge(events, *streams, key=lambda e: e[0])
+
+    def scrape_events(self, path, by_name, default_id):
+        """Events of an NDJSON export or archive, read one scrape at a
+        time; scrapes are in time order within a file."""
+        for scraped_at, books in read_scrapes(path):
+            ts = datetime.strptime(scraped_at, "%Y-%m-%d %H:%M:%S").timestamp()
+            for company_name, book in books.items():
+                issue_id = by_name.get(company_name.strip().lower(), default_id)
+                if issue_id is not None:
+                    yield ts, issue_id, "nse", book, None
+
+    def events(self):
+        if is_store(self.source):
+            return self.events_from_store()
+        return self.events_from_files()
+
+    def publish(self, issue_id, venue, book, cutoff_qty=None):
+        issue = self.issues[issue_id]
+        if venue == "nse":
+            self.publish_nse([issue], {issue.nse_name: (book, cutoff_qty)})
+        else:
+            self.publish_bse(issue, book, cutoff_qty)
+        self.replayed += 1
+
+    def replay_once(self):
+        start = time.time()
+        first_ts = None
+
+        for ts, issue_id, venue, book, cutoff_qty in self.events():
+            if not self.nseRunning:
+                return False
+
+            if self.speed:
+                if first_ts is None:
+                    first_ts = ts
+                delay = (ts - first_ts) / self.speed - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            self.publish(issue_id, venue, book, cutoff_qty)
+
+        return True
+
+    def scrape_nse(self):
+        """Replays the whole timeline, both venues; runs where the NSE
+        scraper thread would."""
+        logger.info("Replay started | source=%s | speed=%s", self.source, self.speed or "max")
+        start = time.time()
+
+        while self.replay_once() and self.loop and self.replayed:
+            pass
+
+        elapsed = time.time() - start
+        logger.info(
+            "Replay finished | books=%d | time=%.2fs | rate=%.0f/s",
+            self.replayed, elapsed, self.replayed / elapsed if elapsed else 0
+        )
+        self.finished = True
+
+    async def scrape_bse_async(self, client):
+        # BSE books are part of the replayed timeline
+        while self.bseRunning:
+            await asyncio.sleep(1)
+
+    def scrape_bse(self):
+        pass
@@ -0,0 +1,178 @@
+"""
+Adaptive poll timing for the scrapers.
+
+Every polled target (an NSE category, a BSE issue) keeps its own
+interval: halved when a fetch brings a changed book, stretched 1.5x when
+it does not, clamped to [min_interval, max_interval]. Before the OFS
+window the base interval applies and outside it the closed interval.
+
+Errors switch a target to exponential backoff with jitter; 403/429 back
+off from a longer base and honour Retry-After. Every request also draws
+from a per-host token bucket, so adaptive speed-ups cannot exceed the
+host's budget.
+"""
+import time
+import random
+from datetime import datetime, time as dtime, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# OFS bidding window, IST, weekdays
+PRE_OPEN = dtime(9, 0)
+OFS_OPEN = dtime(9, 15)
+OFS_CLOSE = dtime(15, 30)
+
+THROTTLED_STATUSES = (403, 429)
+
+
+def market_phase(ts=None):
+    now = datetime.fromtimestamp(time.time() if ts is None else ts, IST)
+    if now.weekday() >= 5:
+        return "closed"
+    t = now.time()
+    if OFS_OPEN <= t < OFS_CLOSE:
+        return "open"
+    if PRE_OPEN <= t < OFS_OPEN:
+        return "pre_open"
+    return "closed"
+
+
+def error_details(exc):
+    """(status, retry_after seconds) of a failed request, where known."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None and exc.args and isinstance(exc.args[0], int):
+        status = exc.args[0]
+
+    retry_after = None
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+    return status, retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+
+    def reserve(self):
+        """Takes a token, returning how long the caller must wait for it.
+        Tokens can go negative, so concurrent callers queue up."""
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class Target:
+    def __init__(self, interval):
+        self.interval = interval
+        self.failures = 0
+        self.next_at = 0.0
+        self.changes = 0
+        self.polls = 0
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        base_interval=10,
+        min_interval=2,
+        max_interval=60,
+        closed_interval=300,
+        backoff_base=5,
+        throttle_base=30,
+        backoff_max=600,
+    ):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closed_interval = closed_interval
+        self.backoff_base = backoff_base
+        self.throttle_base = throttle_base
+        self.backoff_max = backoff_max
+
+        self.targets = {}
+        self.buckets = {}
+
+    def add_host(self, host, rate, burst):
+        """Budget of `rate` requests/s with bursts of up to `burst`."""
+        self.buckets[host] = TokenBucket(rate, burst)
+
+    def target(self, key):
+        if key not in self.targets:
+            self.targets[key] = Target(self.base_interval)
+        return self.targets[key]
+
+    def due_in(self, key):
+        return self.target(key).next_at - time.time()
+
+    def next_due(self, keys):
+        """Seconds until the first of `keys` is due, at least 0."""
+        return max(0.0, min((self.due_in(k) for k in keys), default=0.0))
+
+    def hold(self, key):
+        """Keeps key from coming due until its outcome is recorded."""
+        self.target(key).next_at = float("inf")
+
+    def throttle(self, host):
+        bucket = self.buckets.get(host)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def interval(self, target):
+        phase = market_phase()
+        if phase == "open":
+            return target.interval
+        if phase == "pre_open":
+            return self.base_interval
+        return self.closed_interval
+
+    def record_success(self, key, changed):
+        target = self.target(key)
+        target.failures = 0
+        target.polls += 1
+        if changed:
+            target.changes += 1
+            target.interval = max(self.min_interval, target.interval * 0.5)
+        else:
+            target.interval = min(self.max_interval, target.interval * 1.5)
+
+        # +-10% so targets polled together drift apart
+        delay = self.interval(target) * random.uniform(0.9, 1.1)
+        target.next_at = time.time() + delay
+        return delay
+
+    def record_error(self, key, status=None, retry_after=None):
+        target = self.target(key)
+        target.failures += 1
+        target.polls += 1
+
+        base = self.throttle_base if status in THROTTLED_STATUSES else self.backoff_base
+        ceiling = min(self.backoff_max, base * 2 ** (target.failures - 1))
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        target.next_at = time.time() + delay
+        return delay
+
+    def snapshot(self):
+        now = time.time()
+        return {
+            "phase": market_phase(now),
+            "targets": {
+                ":".join(key): {
+                    "interval": round(t.interval, 2),
+                    "failures": t.failures,
+                    "due_in": round(max(0.0, t.next_at - now), 2) if t.next_at != float("inf") else None,
+                    "change_rate": round(t.changes / t.polls, 2) if t.polls else None,
+                }
+                for key, t in self.targets.items()
+            },
+        }
@@ -1,9 +1,24 @@
 import threading
 import asyncio
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import PlainTextResponse, JSONResponse, Response
 from contextlib import asynccontextmanager
 from nsebse import OFSScraper
-import copy
+from replay import ReplayScraper
+from workers import WorkerScraper
+from bse_client import BSEClient
+from orderbook import OrderBook
+from protocol import BookStream, PROTOCOL_VERSION, ENCODINGS, DEFAULT_ENCODING
+from notify import UpdateSignal
+from store import BookStore, VENUES
+from views import Subscription, View
+from bookcache import BookCache
+import fanout
+from fanout import ClientConnection, queue_depths
+import metrics
+from metrics import COMPUTE_SECONDS, Gauge
+import os
+import json
 import logging
 import time
 
@@ -15,22 +30,85 @@ logging.basicConfig(
 
 logger = logging.getLogger("WS")
 
-scraper = OFSScraper()
-clients = set()
-clients_needing_snapshot = set()
-
-ISSUE_SIZE = 4_757_707
-FLOOR_PRICE = 685
+# "live" scrapes NSE/BSE in this process, "workers" in child processes
+# publishing through shared memory, "replay" re-publishes recorded books
+SOURCE = os.environ.get("OFS_SOURCE", "live")
+if SOURCE == "workers":
+    scraper = WorkerScraper()
+elif SOURCE == "replay":
+    scraper = ReplayScraper(
+        os.environ.get("OFS_REPLAY_PATH", "data/store"),
+        speed=float(os.environ.get("OFS_REPLAY_SPEED", "1")),
+        loop=os.environ.get("OFS_REPLAY_LOOP", "") == "1",
+    )
+else:
+    scraper = OFSScraper()
+clients = {issue_id: set() for issue_id in scraper.issues}
+
+DEFAULT_ISSUE_ID = next(iter(scraper.issues))
+
+# "orderbook" updates levels incrementally, "numpy" rebuilds the merged
+# curve with array operations (curve.VectorBook)
+BOOK_BACKEND = os.environ.get("OFS_BOOK_BACKEND", "orderbook")
+if BOOK_BACKEND == "numpy":
+    from curve import VectorBook as BookBackend
+else:
+    BookBackend = OrderBook
+
+order_books = {
+    issue_id: BookBackend(issue.issue_size)
+    for issue_id, issue in scraper.issues.items()
+}
+applied = {}
+streams = {issue_id: BookStream(issue_id) for issue_id in scraper.issues}
+
+# subscription -> View per issue; the default subscription streams the
+# order book directly and is always present
+DEFAULT_SUBSCRIPTION = Subscription()
+views = {
+    issue_id: {DEFAULT_SUBSCRIPTION: View(issue_id, DEFAULT_SUBSCRIPTION, order_books[issue_id], streams[issue_id])}
+    for issue_id in scraper.issues
+}
+
+# GET /book responses, encoded once per book version
+book_caches = {issue_id: BookCache(issue_id, streams[issue_id], order_books[issue_id]) for issue_id in scraper.issues}
+
+# "event" wakes on each scraper publish, "poll" checks every 0.5 s
+BROADCAST_MODE = os.environ.get("OFS_BROADCAST_MODE", "event")
+BROADCAST_COALESCE = float(os.environ.get("OFS_BROADCAST_COALESCE", "0.01"))
+BROADCAST_IDLE_TIMEOUT = 5.0
+
+# every published book is appended here; set OFS_STORE_DIR="" to disable.
+# <OFS_LATEST_DIR>/<venue>/<issue_id>_latest.csv follow the store on every
+# flush; set OFS_LATEST_DIR="" to skip them
+STORE_DIR = os.environ.get("OFS_STORE_DIR", "data/store")
+LATEST_DIR = os.environ.get("OFS_LATEST_DIR", "data")
+
+update_signal = UpdateSignal()
+scraper.listeners.append(update_signal.notify)
+broadcast_latency = {"mode": BROADCAST_MODE, "count": 0, "total": 0.0, "max": 0.0}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    
+    update_signal.bind(asyncio.get_running_loop())
+
+    # opened here rather than at import, so importing the app writes nothing
+    if STORE_DIR and SOURCE != "replay":
+        scraper.store = BookStore(
+            STORE_DIR,
+            fsync=os.environ.get("OFS_STORE_FSYNC", "batch"),
+            latest_dir=LATEST_DIR or None,
+        )
+
     scraper_thread = threading.Thread(
-        target=scraper.run_both,
+        target=scraper.scrape_nse,
         daemon=True
     )
     scraper_thread.start()
 
+    bse_client = BSEClient(scraper.bse_base_url, max_connections=scraper.bse_max_concurrency)
+    bse_task = asyncio.create_task(scraper.scrape_bse_async(bse_client))
+
     broadcaster_task = asyncio.create_task(broadcaster())
     yield
     
@@ -39,58 +117,257 @@ async def lifespan(app: FastAPI):
     scraper.nseRunning = False
     scraper.bseRunning = False
     broadcaster_task.cancel()
+    bse_task.cancel()
+    await asyncio.gather(bse_task, return_exceptions=True)
+    await bse_client.aclose()
+    # lets the scraper close its browser, or stop its workers
+    await asyncio.to_thread(scraper_thread.join, 15)
+
+    if scraper.store is not None:
+        scraper.store.close()
+        scraper.store = None
 
 app = FastAPI(lifespan=lifespan)
 
+def client_count():
+    return sum(len(c) for c in clients.values())
+
 @app.get("/")
 async def root():
-    return {"status": "running", "clients": len(clients)}
+    return {"status": "running", "clients": client_count()}
+
+@app.get("/issues")
+async def list_issues():
+    return [issue.to_dict() for issue in scraper.issues.values()]
 
 @app.get("/health")
 async def health():
-    with scraper.state_lock:
-        nse_count = len(scraper.nse_data)
-        bse_count = len(scraper.bse_data)
-    
+    issues = {}
+    for issue_id, state in scraper.books.items():
+        issues[issue_id] = {
+            "clients": len(clients[issue_id]),
+            "views": len(views[issue_id]),
+            "queue_depth": queue_depths(clients[issue_id]),
+            "nse_data_count": len(state.nse.book),
+            "bse_data_count": len(state.bse.book)
+        }
+
+    count = broadcast_latency["count"]
+
     return {
         "status": "ok",
-        "clients": len(clients),
-        "nse_data_count": nse_count,
-        "bse_data_count": bse_count
+        "clients": client_count(),
+        "issues": issues,
+        "fanout": fanout.stats,
+        "cycles": scraper.cycle_stats,
+        "schedule": scraper.scheduler.snapshot(),
+        "workers": scraper.worker_status() if SOURCE == "workers" else None,
+        "publish_to_broadcast": {
+            "mode": broadcast_latency["mode"],
+            "count": count,
+            "avg_ms": round(broadcast_latency["total"] / count * 1000, 2) if count else None,
+            "max_ms": round(broadcast_latency["max"] * 1000, 2)
+        }
     }
 
-@app.websocket("/ws/nse")
-async def nse_ws(ws: WebSocket):
-    await ws.accept()
-    clients.add(ws)
-    clients_needing_snapshot.add(ws)
-    print(f"✅ Client connected: {id(ws)}")
+def data_age():
+    now = time.time()
+    return {
+        (issue_id, venue): None if getattr(state, venue).ts is None else now - getattr(state, venue).ts
+        for issue_id, state in scraper.books.items()
+        for venue in VENUES
+    }
+
+Gauge("ofs_data_age_seconds", "Seconds since a venue's book was last fetched.", ("issue_id", "venue"), data_age)
+Gauge("ofs_clients", "Connected WebSocket clients.", ("issue_id",),
+      lambda: {(issue_id,): len(conns) for issue_id, conns in clients.items()})
+Gauge("ofs_client_queue_depth_max", "Deepest client outbound queue.", ("issue_id",),
+      lambda: {(issue_id,): queue_depths(conns)["max"] for issue_id, conns in clients.items()})
+Gauge("ofs_stream_seq", "Last broadcast sequence number.", ("issue_id",),
+      lambda: {(issue_id,): stream.seq for issue_id, stream in streams.items()})
+Gauge("ofs_fanout_events_total", "Frames sent, frames dropped and clients evicted.", ("event",),
+      lambda: {(event,): count for event, count in fanout.stats.items()}, kind="counter")
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def etag_matches(header, etag):
+    """Weak comparison against an If-None-Match header."""
+    if header is None:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (t.removeprefix("W/") for t in tags)
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip, honouring q-values
+    (gzip;q=0 refuses it)."""
+    wildcard = False
+    for item in (header or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding in ("gzip", "x-gzip"):
+            return q > 0
+        if coding == "*":
+            wildcard = q > 0
+    return wildcard
+
+def book_response(request: Request, issue_id: str):
+    if issue_id not in book_caches:
+        return JSONResponse({"detail": f"Unknown issue {issue_id}"}, status_code=404)
+
+    cache = book_caches[issue_id]
+    if not cache.version:
+        return JSONResponse({"detail": "No book yet"}, status_code=503, headers={"Retry-After": "1"})
+
+    try:
+        since = request.query_params.get("since_version")
+        # a version from before a restart maps to None: full snapshot
+        since = None if since is None else cache.parse_token(since)
+    except ValueError:
+        return JSONResponse({"detail": "since_version must be an X-Book-Version value"}, status_code=400)
+
+    headers = {
+        "ETag": cache.etag(),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+        "X-Book-Version": cache.token(),
+    }
+    if etag_matches(request.headers.get("if-none-match"), cache.etag()) or since == cache.version:
+        return Response(status_code=304, headers=headers)
+
+    compress = accepts_gzip(request.headers.get("accept-encoding"))
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return Response(cache.body(since, compress), media_type="application/json", headers=headers)
+
+@app.get("/book")
+async def default_book(request: Request):
+    return book_response(request, DEFAULT_ISSUE_ID)
+
+@app.get("/book/{issue_id}")
+async def issue_book(request: Request, issue_id: str):
+    return book_response(request, issue_id)
+
+def snapshot_source(issue_id, encoding=DEFAULT_ENCODING):
+    return views[issue_id][DEFAULT_SUBSCRIPTION].snapshot_source(encoding)
+
+def subscribe(conn, subscription=DEFAULT_SUBSCRIPTION):
+    """Moves conn to the view for `subscription`, creating the view if it
+    is the first of its kind. Must run on the event loop."""
+    issue_views = views[conn.issue_id]
+    view = issue_views.get(subscription)
+    if view is None:
+        view = issue_views[subscription] = View(conn.issue_id, subscription, order_books[conn.issue_id])
+        stream = streams[conn.issue_id]
+        if stream.seq:
+            view.update(stream.meta)
+
+    unsubscribe(conn)
+    view.members.add(conn)
+    clients[conn.issue_id].add(conn)
+    conn.view = view
+    conn.snapshot = view.snapshot_source(conn.encoding)
+    conn.request_snapshot()
+
+def unsubscribe(conn):
+    clients[conn.issue_id].discard(conn)
+    view = conn.view
+    if view is None:
+        return
+    conn.view = None
+    view.members.discard(conn)
+    if not view.members and not view.direct:
+        view.close()
+        del views[conn.issue_id][view.subscription]
+
+# Sec-WebSocket-Protocol names, e.g. "ofs.v2.packed"
+SUBPROTOCOLS = {f"ofs.v{PROTOCOL_VERSION}.{encoding}": encoding for encoding in ENCODINGS}
+
+def negotiate_encoding(ws: WebSocket):
+    """(encoding, subprotocol) for a connecting client. ?encoding= wins
+    over the offered subprotocols; encoding is None if unsupported."""
+    offered = {SUBPROTOCOLS[p]: p for p in ws.scope.get("subprotocols", ()) if p in SUBPROTOCOLS}
+    requested = ws.query_params.get("encoding")
+    if requested is None:
+        requested = next(iter(offered), DEFAULT_ENCODING)
+    if requested not in ENCODINGS:
+        return None, None
+    return requested, offered.get(requested)
+
+async def serve_issue(ws: WebSocket, issue_id: str):
+    if issue_id not in scraper.issues:
+        await ws.close(code=4404)
+        return
+
+    encoding, subprotocol = negotiate_encoding(ws)
+    if encoding is None:
+        await ws.close(code=4406)
+        return
+    try:
+        subscription = Subscription.from_params(ws.query_params)
+    except (TypeError, ValueError):
+        await ws.close(code=4400)
+        return
+
+    await ws.accept(subprotocol=subprotocol)
+    conn = ClientConnection(ws, issue_id, None, encoding=encoding)
+    subscribe(conn, subscription)
+    writer = asyncio.create_task(conn.run())
+    print(f"✅ Client connected: {id(ws)} | issue={issue_id} | encoding={encoding} | {subscription}")
 
     try:
         while True:
-            await asyncio.sleep(3600)
-    except WebSocketDisconnect:
+            message = await ws.receive_text()
+            try:
+                request = json.loads(message)
+            except ValueError:
+                continue
+            if not isinstance(request, dict):
+                continue
+            if request.get("type") == "resync":
+                conn.request_snapshot()
+            elif request.get("type") == "subscribe":
+                try:
+                    subscribe(conn, Subscription.from_params(request))
+                except (TypeError, ValueError) as e:
+                    logger.info("Subscription rejected | client=%s | %s", id(ws), e)
+    except (WebSocketDisconnect, RuntimeError):
         pass
     finally:
-        clients.discard(ws)
-        clients_needing_snapshot.discard(ws)
+        unsubscribe(conn)
+        conn.closed = True
+        writer.cancel()
         print(f"🧹 Client removed: {id(ws)}")
 
+@app.websocket("/ws/nse")
+async def nse_ws(ws: WebSocket):
+    await serve_issue(ws, DEFAULT_ISSUE_ID)
+
+@app.websocket("/ws/nse/{issue_id}")
+async def issue_ws(ws: WebSocket, issue_id: str):
+    await serve_issue(ws, issue_id)
+
 
 def is_live(fetch_ts, max_age=120):
     return fetch_ts is not None and (time.time() - fetch_ts) <= max_age
 
-def merge_price_qty(nse, bse):
+def merge_price_qty(nse, bse, floor_price, floor_qty):
     prices = set(nse) | set(bse)
     merged = {
         p: nse.get(p, 0) + bse.get(p, 0)
         for p in prices
     }
-    nse_floor_for_retail = scraper.nse_cutoff_qty or 0
-    bse_floor_for_retail = scraper.bse_cutoff_qty or 0
-    floor_qty = nse_floor_for_retail + bse_floor_for_retail
     if(floor_qty>0):
-        merged[FLOOR_PRICE] = merged.get(FLOOR_PRICE, 0) + floor_qty
+        merged[floor_price] = merged.get(floor_price, 0) + floor_qty
     return merged
 
 def cumulative_high_to_low(merged: dict, issue_size: int):
@@ -111,8 +388,8 @@ def cumulative_high_to_low(merged: dict, issue_size: int):
 
     return result, cutoff_price
 
-def subscription_metrics(cumulative, issue_size):
-    if not cumulative:
+def subscription_metrics(total_demand, top_price, issue_size):
+    if top_price is None:
         return {
             "total_demand": 0,
             "subscription_pct": 0.0,
@@ -121,7 +398,6 @@ def subscription_metrics(cumulative, issue_size):
             "top_price": None
         }
 
-    total_demand = cumulative[-1]["cumulative_qty"]
     subscription_pct = round((total_demand / issue_size) * 100, 2)
 
     return {
@@ -129,92 +405,120 @@ def subscription_metrics(cumulative, issue_size):
         "subscription_pct": subscription_pct,
         "remaining_qty": max(0, issue_size - total_demand),
         "oversubscribed": total_demand >= issue_size,
-        "top_price": cumulative[0]["price"]
+        "top_price": top_price
     }
 
-async def broadcaster():
-    logger.info("Broadcaster loop started")
-    last_sent = None
+def refresh_order_book(issue_id):
+    """Applies venue changes since the last call to the issue's order book.
+    Venue snapshots are immutable and versioned, so an unchanged version
+    means an unchanged venue."""
+    issue = scraper.issues[issue_id]
+    state = scraper.books[issue_id]
+    nse = state.nse
+    bse = state.bse
+    floor_qty = (nse.cutoff_qty or 0) + (bse.cutoff_qty or 0)
+
+    book = order_books[issue_id]
+    seen = applied.get(issue_id, (0, 0, None))
+
+    if nse.version != seen[0]:
+        book.update_venue("nse", nse.book)
+    if bse.version != seen[1]:
+        book.update_venue("bse", bse.book)
+    if floor_qty != seen[2]:
+        book.update_venue("floor", {float(issue.floor_price): floor_qty} if floor_qty > 0 else {})
+
+    applied[issue_id] = (nse.version, bse.version, floor_qty)
+    return book, nse.ts, bse.ts
+
+def build_meta(issue, book, nse_last_updated_ts, bse_last_updated_ts):
+    metrics = subscription_metrics(book.total_demand(), book.top_price(), issue.issue_size)
+
+    return {
+        "issue_id": issue.issue_id,
+        "cutoff_price": book.cutoff_price(),
+        "total_demand": metrics["total_demand"],
+        "subscription_pct": metrics["subscription_pct"],
+        "remaining_qty": metrics["remaining_qty"],
+        "oversubscribed": metrics["oversubscribed"],
+        "top_price": metrics["top_price"],
+        "issue_size": issue.issue_size,
+        "floor_price": issue.floor_price,
+        "bse_last_updated_ts": bse_last_updated_ts,
+        "nse_last_updated_ts": nse_last_updated_ts
+    }
+
+def record_latency(published_ts):
+    latency = time.time() - published_ts
+    broadcast_latency["count"] += 1
+    broadcast_latency["total"] += latency
+    broadcast_latency["max"] = max(broadcast_latency["max"], latency)
+
+def broadcast_issue(issue_id, issue, published_ts):
+    start = time.perf_counter()
+    book, nse_ts, bse_ts = refresh_order_book(issue_id)
+    stream = streams[issue_id]
+
+    if not len(book) and stream.seq == 0:
+        logger.debug("No merged data yet for %s, skipping broadcast", issue_id)
+        return
+
+    if book.version == stream.book_version:
+        return
+
+    meta = build_meta(issue, book, nse_ts, bse_ts)
+    COMPUTE_SECONDS.observe(time.perf_counter() - start, issue_id)
+
+    # the direct view comes first and publishes at once; each view
+    # encodes a frame once per encoding its clients use
+    for view in list(views[issue_id].values()):
+        view.update(meta)
+    book_caches[issue_id].record()
+
+    if published_ts is not None:
+        record_latency(published_ts)
+
+    logger.info(
+        "Broadcast queued | issue=%s | seq=%d | clients=%d | cutoff=%s",
+        issue_id,
+        stream.seq,
+        len(clients[issue_id]),
+        stream.meta["cutoff_price"]
+    )
+
+async def broadcaster(mode=None):
+    mode = mode or BROADCAST_MODE
+    broadcast_latency["mode"] = mode
+    logger.info("Broadcaster loop started | mode=%s", mode)
     tick = 0
 
     while True:
         try:
             tick += 1
 
-            with scraper.state_lock:
-                nse = copy.deepcopy(scraper.nse_data)
-                bse = copy.deepcopy(scraper.bse_data)
-
-                nse_last_updated_ts = scraper.nse_last_updated_ts
-                bse_last_updated_ts = scraper.bse_last_updated_ts
-
-            if tick % 10 == 0:
-                logger.info(
-                    "State snapshot | nse=%d | bse=%d | clients=%d",
-                    len(nse),
-                    len(bse),
-                    len(clients)
-                )
+            if mode == "event":
+                pending = await update_signal.wait(BROADCAST_IDLE_TIMEOUT, BROADCAST_COALESCE)
+            else:
+                await asyncio.sleep(0.5)
+                pending = update_signal.drain()
 
-            merged = merge_price_qty(nse, bse)
+            # an idle timeout (or poll tick) sweeps every issue
+            issue_ids = list(pending) if pending else list(scraper.issues)
 
-            if not merged:
-                logger.debug("No merged data yet, skipping broadcast")
-                await asyncio.sleep(0.5)
-                continue
+            for issue_id in issue_ids:
+                broadcast_issue(issue_id, scraper.issues[issue_id], pending.get(issue_id))
 
-            cumulative, cutoff_price = cumulative_high_to_low(
-                merged, ISSUE_SIZE
-            )
-
-            metrics = subscription_metrics(cumulative, ISSUE_SIZE)
-
-            payload = {
-                "data": cumulative,
-                "meta": {
-                    "cutoff_price": cutoff_price,
-                    "total_demand": metrics["total_demand"],
-                    "subscription_pct": metrics["subscription_pct"],
-                    "remaining_qty": metrics["remaining_qty"],
-                    "oversubscribed": metrics["oversubscribed"],
-                    "top_price": metrics["top_price"],
-                    "issue_size": ISSUE_SIZE,
-                    "bse_last_updated_ts": bse_last_updated_ts,
-                    "nse_last_updated_ts": nse_last_updated_ts
-                }
-            }
-
-            sent = 0
-            skipped = 0
-            dead = set()
-
-            for ws in list(clients):
-                try:
-                    if cumulative != last_sent or ws in clients_needing_snapshot:
-                        await ws.send_json(payload)
-                        clients_needing_snapshot.discard(ws)
-                        sent += 1
-                    else:
-                        skipped += 1
-
-                except (WebSocketDisconnect, RuntimeError):
-                    dead.add(ws)
-
-            if dead:
-                clients.difference_update(dead)
-                clients_needing_snapshot.difference_update(dead)
-                logger.warning("Removed %d dead clients", len(dead))
-
-            if sent > 0:
-                logger.info(
-                    "Broadcast sent | sent=%d | skipped=%d | cutoff=%s",
-                    sent,
-                    skipped,
-                    cutoff_price
-                )
-
-            last_sent = copy.deepcopy(cumulative)
-            await asyncio.sleep(0.5)
+            if tick % 10 == 0:
+                for issue_id in scraper.issues:
+                    book = order_books[issue_id]
+                    logger.info(
+                        "State snapshot | issue=%s | nse=%d | bse=%d | levels=%d | clients=%d",
+                        issue_id,
+                        len(book.venues.get("nse", ())),
+                        len(book.venues.get("bse", ())),
+                        len(book),
+                        len(clients[issue_id])
+                    )
 
         except asyncio.CancelledError:
             logger.info("Broadcaster cancelled")
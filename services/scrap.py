@@ -1,14 +1,22 @@
-import httpx
 from bs4 import BeautifulSoup
 import asyncio
+from bse_client import BSEClient
 
-async def scrap_page(url: str) -> dict:
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
+async def scrap_page(client: BSEClient, scripcode: str, flag: str = "NR"):
+    html = await client.fetch(scripcode, flag)
+    if html is None:
+        return None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
 
     return soup
 
-asyncio.run(scrap_page("https://www.bseindia.com/markets/PublicIssues/BSEbidDetails_ofs.aspx?flag=NR&Scripcode=544282"))
\ No newline at end of file
+async def main():
+    client = BSEClient()
+    try:
+        await scrap_page(client, "544282")
+    finally:
+        await client.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
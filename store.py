@@ -0,0 +1,305 @@
+"""
+Append-only store of book snapshots.
+
+Each issue gets one segment file per UTC day under <root>/<issue_id>/.
+A segment is a sequence of blocks, one per published book:
+
+    header  <dBIq  ts (float64), venue (uint8), level count n (uint32),
+                   cut-off qty (int64, -1 if unknown)
+    prices  n x float64
+    qty     n x int64
+
+so a block is a columnar slice of (ts, venue, price, qty) records with ts,
+venue and the cut-off quantity stored once. A sidecar .idx file holds one <dBQ entry
+(ts, venue, offset) per block; range reads bisect the index and decode
+blocks straight out of a memory-mapped segment.
+
+Given a latest_dir, every flush also rewrites
+<latest_dir>/<venue>/<issue_id>_latest.csv for the books it wrote, so the
+*_latest files always follow the store.
+
+    python store.py latest HINDZINC nse    # data/nse/HINDZINC_latest.csv
+    python store.py range HINDZINC --start 1769590000 --end 1769600000
+"""
+import os
+import io
+import sys
+import csv
+import mmap
+import time
+import struct
+import argparse
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+VENUES = ("nse", "bse")
+VENUE_CODES = {name: code for code, name in enumerate(VENUES)}
+
+BLOCK_HEADER = struct.Struct("<dBIq")
+NO_CUTOFF = -1
+INDEX_ENTRY = struct.Struct("<dBQ")
+
+# array() uses native byte order; blocks are little-endian on disk
+SWAP = sys.byteorder != "little"
+
+
+def segment_name(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def encode_block(ts, venue, book, cutoff_qty=None):
+    prices = array("d", book.keys())
+    qty = array("q", map(int, book.values()))
+    if SWAP:
+        prices.byteswap()
+        qty.byteswap()
+    cutoff = NO_CUTOFF if cutoff_qty is None else int(cutoff_qty)
+    return BLOCK_HEADER.pack(ts, VENUE_CODES[venue], len(prices), cutoff) + prices.tobytes() + qty.tobytes()
+
+
+def decode_block(buf, offset):
+    """(ts, venue, {price: qty}, cutoff_qty)"""
+    ts, venue, n, cutoff = BLOCK_HEADER.unpack_from(buf, offset)
+    start = offset + BLOCK_HEADER.size
+    prices = array("d", buf[start:start + 8 * n])
+    qty = array("q", buf[start + 8 * n:start + 16 * n])
+    if SWAP:
+        prices.byteswap()
+        qty.byteswap()
+    return ts, VENUES[venue], dict(zip(prices, qty)), None if cutoff == NO_CUTOFF else cutoff
+
+
+def write_latest_csv(path, book):
+    """Writes a `*_latest.csv`, replacing the file atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Price Interval", "Qty Confirmed"])
+        for price in sorted(book):
+            writer.writerow([price, book[price]])
+    os.replace(tmp, path)
+
+
+class SegmentWriter:
+    def __init__(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        self.name = name
+        self.data = open(os.path.join(directory, f"{name}.seg"), "ab")
+        self.index = open(os.path.join(directory, f"{name}.idx"), "ab")
+        self.offset = self.data.tell()
+
+    def write(self, blocks):
+        data = io.BytesIO()
+        index = io.BytesIO()
+        for ts, venue, block in blocks:
+            index.write(INDEX_ENTRY.pack(ts, VENUE_CODES[venue], self.offset + data.tell()))
+            data.write(block)
+
+        self.data.write(data.getvalue())
+        self.index.write(index.getvalue())
+        self.offset += data.tell()
+
+    def flush(self, fsync):
+        self.data.flush()
+        self.index.flush()
+        if fsync:
+            os.fsync(self.data.fileno())
+            os.fsync(self.index.fileno())
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+
+class SegmentReader:
+    def __init__(self, directory, name):
+        with open(os.path.join(directory, f"{name}.idx"), "rb") as f:
+            entries = list(INDEX_ENTRY.iter_unpack(f.read()))
+        self.ts = [e[0] for e in entries]
+        self.venues = [e[1] for e in entries]
+        self.offsets = [e[2] for e in entries]
+
+        self.file = open(os.path.join(directory, f"{name}.seg"), "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def read(self, start_ts=None, end_ts=None, venue=None):
+        lo = 0 if start_ts is None else bisect_left(self.ts, start_ts)
+        hi = len(self.ts) if end_ts is None else bisect_right(self.ts, end_ts)
+        code = None if venue is None else VENUE_CODES[venue]
+        for i in range(lo, hi):
+            if code is None or self.venues[i] == code:
+                yield decode_block(self.buf, self.offsets[i])
+
+    def latest(self, venue):
+        code = VENUE_CODES[venue]
+        for i in range(len(self.ts) - 1, -1, -1):
+            if self.venues[i] == code:
+                return decode_block(self.buf, self.offsets[i])
+        return None
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self.file.close()
+
+
+class BookStore:
+    """Buffers appended books and writes them out in batches.
+
+    fsync policy:
+      "always"  write and fsync on every append
+      "batch"   write every `batch_size` appends or `flush_interval`
+                seconds, fsync on each write
+      "never"   batched writes, durability left to the OS
+
+    A batch is written once it is full or, at the latest, flush_interval
+    seconds after its first append, even if nothing else is appended.
+    """
+
+    def __init__(self, root="data/store", fsync="batch", batch_size=64, flush_interval=1.0, latest_dir=None):
+        if fsync not in ("always", "batch", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.root = root
+        self.fsync = fsync
+        self.batch_size = 1 if fsync == "always" else batch_size
+        self.flush_interval = flush_interval
+        self.latest_dir = latest_dir
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.pending_count = 0
+        self.last_flush = time.time()
+        self.writers = {}
+        self.flush_timer = None
+
+    def append(self, issue_id, venue, ts, book, cutoff_qty=None):
+        block = encode_block(ts, venue, book, cutoff_qty)
+        with self.lock:
+            key = (issue_id, segment_name(ts))
+            self.pending.setdefault(key, []).append((ts, venue, block))
+            self.pending_count += 1
+
+            if self.pending_count >= self.batch_size or time.time() - self.last_flush >= self.flush_interval:
+                self.flush_locked()
+            elif self.flush_timer is None:
+                # writes this batch even if no further append arrives
+                self.flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+
+        latest = {}
+        for (issue_id, name), blocks in self.pending.items():
+            writer = self.writers.get(issue_id)
+            if writer is None or writer.name != name:
+                if writer is not None:
+                    writer.close()
+                writer = SegmentWriter(os.path.join(self.root, issue_id), name)
+                self.writers[issue_id] = writer
+            writer.write(blocks)
+            writer.flush(self.fsync != "never")
+            for ts, venue, block in blocks:
+                latest[issue_id, venue] = block
+
+        if self.latest_dir is not None:
+            for (issue_id, venue), block in latest.items():
+                _, _, book, _ = decode_block(block, 0)
+                write_latest_csv(os.path.join(self.latest_dir, venue, f"{issue_id}_latest.csv"), book)
+
+        self.pending.clear()
+        self.pending_count = 0
+        self.last_flush = time.time()
+
+    def segments(self, issue_id):
+        directory = os.path.join(self.root, issue_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(n[:-4] for n in os.listdir(directory) if n.endswith(".idx"))
+
+    def read(self, issue_id, start_ts=None, end_ts=None, venue=None):
+        """Yields (ts, venue, {price: qty}, cutoff_qty) in time order."""
+        self.flush()
+        directory = os.path.join(self.root, issue_id)
+        for name in self.segments(issue_id):
+            if start_ts is not None and name < segment_name(start_ts):
+                continue
+            if end_ts is not None and name > segment_name(end_ts):
+                break
+            reader = SegmentReader(directory, name)
+            try:
+                yield from reader.read(start_ts, end_ts, venue)
+            finally:
+                reader.close()
+
+    def latest(self, issue_id, venue):
+        self.flush()
+        directory = os.path.join(self.root, issue_id)
+        for name in reversed(self.segments(issue_id)):
+            reader = SegmentReader(directory, name)
+            try:
+                found = reader.latest(venue)
+            finally:
+                reader.close()
+            if found is not None:
+                return found
+        return None
+
+    def export_latest(self, issue_id, venue, path):
+        """Writes the latest stored book as a `*_latest.csv`."""
+        found = self.latest(issue_id, venue)
+        if found is None:
+            return False
+
+        write_latest_csv(path, found[2])
+        return True
+
+    def close(self):
+        with self.lock:
+            self.flush_locked()
+            for writer in self.writers.values():
+                writer.close()
+            self.writers.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="data/store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    latest = sub.add_parser("latest", help="export the latest book of an issue/venue as CSV")
+    latest.add_argument("issue_id")
+    latest.add_argument("venue", choices=VENUES)
+    latest.add_argument("--out", help="defaults to data/<venue>/<issue_id>_latest.csv, the file flushes keep fresh")
+
+    scan = sub.add_parser("range", help="list stored books in a time range")
+    scan.add_argument("issue_id")
+    scan.add_argument("--start", type=float)
+    scan.add_argument("--end", type=float)
+    scan.add_argument("--venue", choices=VENUES)
+
+    args = parser.parse_args()
+    store = BookStore(args.root)
+
+    if args.command == "latest":
+        out = args.out or os.path.join("data", args.venue, f"{args.issue_id}_latest.csv")
+        if not store.export_latest(args.issue_id, args.venue, out):
+            raise SystemExit(f"No {args.venue} books stored for {args.issue_id}")
+        print(out)
+    else:
+        for ts, venue, book, cutoff_qty in store.read(args.issue_id, args.start, args.end, args.venue):
+            print(
+                f"{datetime.fromtimestamp(ts).isoformat()} {venue} levels={len(book)} "
+                f"qty={sum(book.values())} cutoff_qty={cutoff_qty}"
+            )
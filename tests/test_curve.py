@@ -0,0 +1,134 @@
+"""
+OrderBook and VectorBook against the dict implementation in server.py
+(merge_price_qty + cumulative_high_to_low), on random sequences of level
+adds, updates and removals, plus the vectorized curve.py functions.
+
+    python -m pytest tests
+"""
+import os
+import json
+import random
+import pytest
+from orderbook import OrderBook
+from curve import VectorBook, merge_price_qty, cumulative_high_to_low
+from protocol import BookStream
+
+# importing the app must not record anything
+os.environ["OFS_STORE_DIR"] = ""
+os.environ["OFS_LATEST_DIR"] = ""
+import server
+
+FLOOR_PRICE = 685.0
+BACKENDS = [OrderBook, VectorBook]
+
+
+def random_price():
+    # a coarse grid, so venues share levels and removed prices come back
+    return round(FLOOR_PRICE + random.randint(0, 200) * 0.05, 2)
+
+
+def mutate(levels):
+    """A venue's next book: some levels added, updated and removed."""
+    levels = dict(levels)
+    for _ in range(random.randint(0, 20)):
+        action = random.random()
+        if levels and action < 0.3:
+            del levels[random.choice(list(levels))]
+        elif levels and action < 0.6:
+            levels[random.choice(list(levels))] = random.randint(0, 50_000)
+        else:
+            levels[random_price()] = random.randint(0, 50_000)
+    if random.random() < 0.05:
+        levels = {}
+    return levels
+
+
+def expected(venues, issue_size):
+    merged = server.merge_price_qty(venues.get("nse", {}), venues.get("bse", {}), FLOOR_PRICE, 0)
+    return server.cumulative_high_to_low(merged, issue_size)
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda b: b.__name__)
+@pytest.mark.parametrize("seed", range(20))
+def test_book_matches_dict_curve(backend, seed):
+    random.seed(seed)
+    issue_size = random.randint(1, 2_000_000)
+    book = backend(issue_size)
+    venues = {}
+
+    for _ in range(100):
+        venue = random.choice(["nse", "bse"])
+        venues[venue] = mutate(venues.get(venue, {}))
+        book.update_venue(venue, venues[venue])
+
+        rows, cutoff = expected(venues, issue_size)
+        assert book.levels() == rows
+        assert book.cutoff_price() == cutoff
+        assert book.total_demand() == (rows[-1]["cumulative_qty"] if rows else 0)
+        assert book.top_price() == (rows[0]["price"] if rows else None)
+        assert len(book) == len(rows)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_large_reloads_match_dict_curve(seed):
+    # whole books replaced at once take OrderBook's rebuild path
+    random.seed(seed)
+    issue_size = random.randint(1, 20_000_000)
+    books = [OrderBook(issue_size), VectorBook(issue_size)]
+    venues = {}
+
+    for _ in range(10):
+        venue = random.choice(["nse", "bse"])
+        venues[venue] = {random_price() + random.randint(0, 3) * 0.01: random.randint(0, 50_000) for _ in range(300)}
+        rows, cutoff = expected(venues, issue_size)
+        for book in books:
+            book.update_venue(venue, venues[venue])
+            assert book.levels() == rows
+            assert book.cutoff_price() == cutoff
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_deltas_rebuild_the_book(seed):
+    """Deltas of either backend replayed on a client-side book reproduce
+    it, and both backends encode the same snapshots."""
+    random.seed(seed)
+    ob, vb = OrderBook(1_000_000), VectorBook(1_000_000)
+    ob_stream, vb_stream = BookStream("X"), BookStream("X")
+    clients = [{}, {}]
+    venues = {}
+
+    for _ in range(50):
+        venue = random.choice(["nse", "bse"])
+        venues[venue] = mutate(venues.get(venue, {}))
+        for book, stream, client in ((ob, ob_stream, clients[0]), (vb, vb_stream, clients[1])):
+            book.update_venue(venue, venues[venue])
+            delta = stream.publish(book, {})
+            if delta is not None:
+                delta = json.loads(delta)
+                client.update((price, qty) for price, qty in delta["changed"])
+                for price in delta["removed"]:
+                    del client[price]
+            assert client == {row["price"]: row["qty"] for row in book.levels()}
+
+        assert ob_stream.snapshot_frame(ob) == vb_stream.snapshot_frame(vb)
+
+
+@pytest.mark.parametrize("floor_qty", [0, 12_345])
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_curve_matches_dict_curve(seed, floor_qty):
+    random.seed(seed)
+    nse = {random_price(): random.randint(0, 50_000) for _ in range(150)}
+    bse = {random_price() + 0.025: random.randint(0, 50_000) for _ in range(150)}
+    total = sum(nse.values()) + sum(bse.values())
+
+    for a, b, issue_size in ((nse, bse, total // 3), ({}, {}, 1), (nse, {}, total * 2)):
+        merged = server.merge_price_qty(a, b, FLOOR_PRICE, floor_qty)
+        rows, cutoff = server.cumulative_high_to_low(merged, issue_size)
+
+        prices, qty = merge_price_qty(a, b, FLOOR_PRICE, floor_qty)
+        payload, vec_cutoff = cumulative_high_to_low(prices, qty, issue_size)
+
+        assert vec_cutoff == cutoff
+        assert payload["price"] == [r["price"] for r in rows]
+        assert payload["qty"] == [r["qty"] for r in rows]
+        assert payload["cumulative_qty"] == [r["cumulative_qty"] for r in rows]
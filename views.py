@@ -0,0 +1,183 @@
+"""
+Per-connection subscriptions: a client can ask for a minimum interval
+between frames, a price window around the cutoff and/or only the top N
+levels.
+
+    /ws/nse/HINDZINC?interval=2&window=5&top=50
+    {"type": "subscribe", "interval": 2, "window": 5, "top": 50}
+
+Clients with the same subscription share a View: one trimmed copy of the
+book, one BookStream and so one encoded frame per update, whatever the
+number of clients. A throttled view conflates: it publishes at most once
+per interval, diffing what it last sent against the book as it is then.
+
+A trimmed view's deltas only carry its own levels, so its meta has
+"cumulative_base", the demand above its highest level, for clients
+recomputing cumulative quantities.
+"""
+import math
+import time
+import asyncio
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, asdict
+from protocol import BookStream
+
+MAX_INTERVAL = 60.0
+
+
+def negated(price):
+    return -price
+
+
+def as_list(values):
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    interval: float = 0.0
+    window: float | None = None
+    top: int | None = None
+
+    @classmethod
+    def from_params(cls, params):
+        """From query parameters or a subscribe message; ValueError if
+        a value is malformed or out of range, TypeError if it is not a
+        number or string at all."""
+        interval = float(params.get("interval") or 0)
+        window = params.get("window")
+        window = None if window in (None, "") else float(window)
+        top = params.get("top")
+        top = None if top in (None, "") else int(top)
+
+        if not math.isfinite(interval) or (window is not None and not math.isfinite(window)):
+            raise ValueError("interval and window must be finite")
+        if not 0 <= interval <= MAX_INTERVAL:
+            raise ValueError(f"interval must be between 0 and {MAX_INTERVAL}")
+        if window is not None and window < 0:
+            raise ValueError("window must not be negative")
+        if top is not None and top < 1:
+            raise ValueError("top must be at least 1")
+        return cls(interval, window, top)
+
+    @property
+    def trimmed(self):
+        return self.window is not None or self.top is not None
+
+    def bounds(self, prices, cutoff_price):
+        """[start, end) of the levels shown, prices sorted high to low."""
+        start, end = 0, len(prices)
+        if self.window is not None and end:
+            # undersubscribed: every bid clears, centre on the lowest price
+            centre = cutoff_price if cutoff_price is not None else float(prices[-1])
+            start = bisect_left(prices, -(centre + self.window), key=negated)
+            end = bisect_right(prices, -(centre - self.window), key=negated)
+        if self.top is not None:
+            end = min(end, start + self.top)
+        return start, end
+
+
+class TrimmedBook:
+    """The levels one view shows, with the book interface BookStream
+    needs. Changes are found by diffing against the previous slice."""
+
+    def __init__(self):
+        self.prices = []
+        self.qty = []
+        self.cumulative = []
+        self.index = {}
+        self.base = 0
+        self.version = 0
+        self.changed = set()
+
+    def __len__(self):
+        return len(self.prices)
+
+    def update(self, prices, qty, cumulative, base):
+        index = dict(zip(prices, qty))
+        old = self.index
+        changed = old.keys() - index.keys()
+        changed.update(p for p, q in index.items() if old.get(p) != q)
+
+        self.prices, self.qty, self.cumulative = prices, qty, cumulative
+        self.index = index
+        if changed or base != self.base:
+            self.base = base
+            self.version += 1
+            self.changed |= changed
+
+    def drain_changes(self):
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def level_qty(self, price):
+        return self.index.get(price)
+
+    def columns(self):
+        return self.prices, self.qty, self.cumulative
+
+    def levels(self):
+        return [
+            {"price": p, "qty": q, "cumulative_qty": c}
+            for p, q, c in zip(self.prices, self.qty, self.cumulative)
+        ]
+
+
+class View:
+    """One subscription of one issue and the clients sharing it.
+
+    The default subscription is the direct view: it streams the order
+    book itself through the issue's main BookStream. Only one stream may
+    drain a book's changes, so every other view streams a TrimmedBook.
+    """
+
+    def __init__(self, issue_id, subscription, source, stream=None):
+        self.subscription = subscription
+        self.source = source
+        self.direct = stream is not None
+        self.stream = stream or BookStream(issue_id)
+        self.book = source if self.direct else TrimmedBook()
+        self.members = set()
+
+        self.meta = None
+        self.sent_at = 0.0
+        self.flush_handle = None
+
+    def snapshot_source(self, encoding):
+        return lambda: self.stream.snapshot_frame(self.book, encoding) if self.stream.seq else None
+
+    def update(self, meta):
+        """Takes a new version of the source book. Must run on the event
+        loop, like the broadcaster."""
+        self.meta = meta
+        if self.flush_handle is not None:
+            # the pending flush will pick up this version
+            return
+
+        wait = self.sent_at + self.subscription.interval - time.monotonic()
+        if wait > 0:
+            self.flush_handle = asyncio.get_running_loop().call_later(wait, self.flush)
+        else:
+            self.flush()
+
+    def trim(self):
+        prices, qty, cumulative = self.source.columns()
+        start, end = self.subscription.bounds(prices, self.meta["cutoff_price"])
+        base = int(cumulative[start - 1]) if start else 0
+        self.book.update(as_list(prices[start:end]), as_list(qty[start:end]), as_list(cumulative[start:end]), base)
+        return dict(self.meta, view=asdict(self.subscription), cumulative_base=base)
+
+    def flush(self):
+        self.flush_handle = None
+        meta = self.meta if self.direct else self.trim()
+        if not self.stream.advance(self.book, meta):
+            return
+
+        self.sent_at = time.monotonic()
+        for conn in self.members:
+            conn.offer(self.stream.delta_frame(conn.encoding))
+
+    def close(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
@@ -0,0 +1,337 @@
+"""
+Worker mode: every scraper runs in its own process and publishes books
+into shared memory, so Chromium driving and HTML parsing never compete
+with the API process for the GIL, and a crashing scraper only takes its
+own process down.
+
+Each (issue, venue) has a BookRing: a shared_memory block with a record
+counter and a few fixed-size slots. A slot is a seqlock sequence, the
+fetch ts, the cut-off qty and the level count, followed by float64
+prices and int64 quantities. The writer makes the sequence odd, writes
+the slot, makes it even again and only then bumps the counter; readers
+retry if the sequence was odd or moved while they read. Levels are read
+through memoryview casts over the block, with nothing pickled or piped.
+The workers only send a (issue_id, venue) doorbell over a queue.
+
+A fetch that finds a book unchanged rewrites the current book with its
+new timestamp and rings too, so the parent's timestamps and data age
+keep moving while books are quiet.
+
+    OFS_SOURCE=workers uvicorn server:app
+"""
+import os
+import time
+import queue
+import struct
+import asyncio
+import logging
+import threading
+import multiprocessing as mp
+from array import array
+from multiprocessing import shared_memory
+from nsebse import OFSScraper
+
+logger = logging.getLogger("OFS")
+
+RING_HEADER = struct.Struct("<Q")
+SLOT_HEADER = struct.Struct("<QdqI4x")
+SEQ = struct.Struct("<Q")
+
+DEFAULT_SLOTS = 4
+DEFAULT_MAX_LEVELS = 4096
+
+
+class BookRing:
+    def __init__(self, name, create=False, slots=DEFAULT_SLOTS, max_levels=DEFAULT_MAX_LEVELS):
+        self.slots = slots
+        self.max_levels = max_levels
+        self.slot_size = SLOT_HEADER.size + 16 * max_levels
+
+        size = RING_HEADER.size + slots * self.slot_size
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.buf = self.shm.buf
+        self.name = name
+
+    def slot_offset(self, record):
+        return RING_HEADER.size + (record % self.slots) * self.slot_size
+
+    def version(self):
+        """Records written so far."""
+        return RING_HEADER.unpack_from(self.buf, 0)[0]
+
+    def write(self, book, cutoff_qty, ts):
+        n = len(book)
+        if n > self.max_levels:
+            raise ValueError(f"Book has {n} levels, ring {self.name} holds {self.max_levels}")
+
+        written = self.version()
+        offset = self.slot_offset(written)
+        seq = SEQ.unpack_from(self.buf, offset)[0]
+        # odd while writing; also recovers a slot left odd by a crashed writer
+        start = (seq + 1) | 1
+
+        SEQ.pack_into(self.buf, offset, start)
+        SLOT_HEADER.pack_into(self.buf, offset, start, ts, -1 if cutoff_qty is None else cutoff_qty, n)
+        prices = offset + SLOT_HEADER.size
+        qty = prices + 8 * self.max_levels
+        self.buf[prices:prices + 8 * n] = array("d", book.keys()).tobytes()
+        self.buf[qty:qty + 8 * n] = array("q", book.values()).tobytes()
+        SEQ.pack_into(self.buf, offset, start + 1)
+
+        RING_HEADER.pack_into(self.buf, 0, written + 1)
+        return written + 1
+
+    def read(self, retries=100):
+        """(version, book, cutoff_qty, ts) of the newest record, or None if
+        nothing has been written yet."""
+        for _ in range(retries):
+            written = self.version()
+            if not written:
+                return None
+
+            offset = self.slot_offset(written - 1)
+            seq, ts, cutoff_qty, n = SLOT_HEADER.unpack_from(self.buf, offset)
+            if seq & 1:
+                continue
+
+            prices = offset + SLOT_HEADER.size
+            qty = prices + 8 * self.max_levels
+            with self.buf[prices:prices + 8 * n].cast("d") as p, self.buf[qty:qty + 8 * n].cast("q") as q:
+                book = dict(zip(p, q))
+
+            if SEQ.unpack_from(self.buf, offset)[0] == seq:
+                return written, book, (None if cutoff_qty < 0 else cutoff_qty), ts
+
+        raise RuntimeError(f"Ring {self.name} kept changing during read")
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def watch_stop(stop, scraper):
+    """Stops the worker's scraper when the supervisor asks or dies."""
+    parent = mp.parent_process()
+    while not stop.value:
+        if parent is not None and not parent.is_alive():
+            break
+        time.sleep(0.5)
+    scraper.nseRunning = False
+    scraper.bseRunning = False
+
+
+def ring_writer(scraper, venue, rings, doorbell):
+    def publish(issue_id, ts):
+        snapshot = getattr(scraper.books[issue_id], venue)
+        if not snapshot.version:
+            # refreshed before anything was published
+            return
+        try:
+            rings[issue_id].write(snapshot.book, snapshot.cutoff_qty, snapshot.ts)
+        except ValueError:
+            logger.exception("Book not published | issue=%s | venue=%s", issue_id, venue)
+            return
+        doorbell.put((issue_id, venue))
+    return publish
+
+
+def attach_rings(scraper, venue, rings, doorbell):
+    publish = ring_writer(scraper, venue, rings, doorbell)
+    scraper.listeners.append(publish)
+    scraper.refresh_listeners.append(lambda issue_id, _venue, ts: publish(issue_id, ts))
+
+
+def nse_worker(issues, ring_names, doorbell, stop, headless=True):
+    scraper = OFSScraper(issues)
+    scraper.nse_headless = headless
+    rings = {issue_id: BookRing(name) for issue_id, name in ring_names.items()}
+    attach_rings(scraper, "nse", rings, doorbell)
+    threading.Thread(target=watch_stop, args=(stop, scraper), daemon=True).start()
+
+    try:
+        scraper.scrape_nse()
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+def bse_worker(issue, ring_name, doorbell, stop, base_url=None):
+    scraper = OFSScraper([issue])
+    if base_url:
+        scraper.bse_base_url = base_url
+    rings = {issue.issue_id: BookRing(ring_name)}
+    attach_rings(scraper, "bse", rings, doorbell)
+    threading.Thread(target=watch_stop, args=(stop, scraper), daemon=True).start()
+
+    try:
+        scraper.scrape_bse()
+    finally:
+        rings[issue.issue_id].close()
+
+
+class Worker:
+    def __init__(self, name, target, args):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.process = None
+        self.restarts = 0
+        self.start_at = 0.0
+
+
+class WorkerScraper(OFSScraper):
+    """Runs the NSE scraper and one BSE scraper per issue as child
+    processes and mirrors their rings into this process's snapshots.
+
+    The supervisor loop runs where the NSE scraper thread would. A worker
+    that exits is restarted after an exponential delay; the server keeps
+    serving the last books meanwhile.
+    """
+
+    def __init__(self, issues=None, restart_backoff=2.0, max_restart_backoff=60.0):
+        super().__init__(issues)
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+
+        self.ctx = mp.get_context("spawn")
+        self.doorbell = self.ctx.Queue()
+        # a plain shared flag: an mp.Event can deadlock set() if a worker
+        # was killed while waiting on it
+        self.stop = self.ctx.RawValue("b", 0)
+
+        self.rings = {}
+        self.seen = {}
+        # rings whose last drain failed; left alone until they ring again
+        self.failed = set()
+        self.workers = {}
+
+    def create_rings(self):
+        tag = os.getpid()
+        for issue_id in self.issues:
+            for venue in ("nse", "bse"):
+                self.rings[(issue_id, venue)] = BookRing(f"ofs_{tag}_{issue_id}_{venue}", create=True)
+                self.seen[(issue_id, venue)] = 0
+
+        self.workers["nse"] = Worker("nse", nse_worker, (
+            list(self.issues.values()),
+            {issue_id: self.rings[(issue_id, "nse")].name for issue_id in self.issues},
+            self.doorbell,
+            self.stop,
+            self.nse_headless,
+        ))
+        for issue_id, issue in self.issues.items():
+            self.workers[f"bse:{issue_id}"] = Worker(f"bse:{issue_id}", bse_worker, (
+                issue,
+                self.rings[(issue_id, "bse")].name,
+                self.doorbell,
+                self.stop,
+                self.bse_base_url,
+            ))
+
+    def start_worker(self, worker):
+        worker.process = self.ctx.Process(target=worker.target, args=worker.args, name=f"ofs-{worker.name}", daemon=True)
+        worker.process.start()
+        logger.info("Worker started | name=%s | pid=%s | restarts=%d", worker.name, worker.process.pid, worker.restarts)
+
+    def check_workers(self):
+        now = time.time()
+        for worker in self.workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                continue
+
+            if worker.process is not None:
+                logger.warning("Worker exited | name=%s | exitcode=%s", worker.name, worker.process.exitcode)
+                worker.process = None
+                worker.restarts += 1
+                delay = min(self.max_restart_backoff, self.restart_backoff * 2 ** (worker.restarts - 1))
+                worker.start_at = now + delay
+
+            if now >= worker.start_at:
+                self.start_worker(worker)
+
+    def drain_ring(self, issue_id, venue):
+        key = (issue_id, venue)
+        ring = self.rings[key]
+        if ring.version() == self.seen[key]:
+            return
+
+        version, book, cutoff_qty, ts = ring.read()
+        self.seen[key] = version
+        if self.apply_book(venue, issue_id, book, cutoff_qty, ts):
+            self.notify([issue_id], ts)
+
+    def try_drain(self, key):
+        """drain_ring that never takes the supervisor down: a torn read or
+        a store error is logged and the ring skipped until its next
+        doorbell."""
+        try:
+            self.drain_ring(*key)
+        except Exception:
+            self.failed.add(key)
+            logger.exception("Ring drain failed | issue=%s | venue=%s", *key)
+        else:
+            self.failed.discard(key)
+
+    def supervise(self):
+        last_check = 0.0
+        while self.nseRunning:
+            try:
+                key = self.doorbell.get(timeout=0.5)
+            except queue.Empty:
+                key = None
+
+            if key is None:
+                # doorbells can be lost if a worker dies mid-publish
+                for key in self.rings:
+                    if key not in self.failed:
+                        self.try_drain(key)
+            else:
+                self.try_drain(tuple(key))
+
+            if time.time() - last_check >= 1.0:
+                self.check_workers()
+                last_check = time.time()
+
+    def stop_workers(self, timeout=10):
+        self.stop.value = 1
+        deadline = time.time() + timeout
+        for worker in self.workers.values():
+            if worker.process is None:
+                continue
+            worker.process.join(max(0, deadline - time.time()))
+            if worker.process.is_alive():
+                logger.warning("Worker did not stop, terminating | name=%s", worker.name)
+                worker.process.terminate()
+                worker.process.join(1)
+
+    def scrape_nse(self):
+        self.create_rings()
+        try:
+            self.check_workers()
+            self.supervise()
+        finally:
+            self.stop_workers()
+            for ring in self.rings.values():
+                ring.close()
+                ring.unlink()
+
+    async def scrape_bse_async(self, client):
+        # BSE runs in its own worker processes
+        while self.bseRunning:
+            await asyncio.sleep(1)
+
+    def scrape_bse(self):
+        pass
+
+    def worker_status(self):
+        return {
+            name: {
+                "pid": w.process.pid if w.process is not None else None,
+                "alive": w.process is not None and w.process.is_alive(),
+                "restarts": w.restarts,
+            }
+            for name, w in self.workers.items()
+        }